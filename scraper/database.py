@@ -16,6 +16,29 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+OPPORTUNITY_UPSERT_SQL = """
+    INSERT OR REPLACE INTO opportunities (
+        opportunity_id, solicitation_number, title, description,
+        type, type_code, posted_date, modified_date,
+        response_deadline, response_timezone, is_active, is_canceled,
+        agency_name, sub_agency_name, office_name,
+        naics_code, psc_code, set_aside_type, set_aside_description,
+        place_city, place_state, place_state_code, place_country, place_country_code,
+        sam_gov_link, award_amount, award_awardee, award_awardee_uei,
+        contacts_json, attachments_json, raw_data_json,
+        scraped_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+
+ATTACHMENT_UPSERT_SQL = """
+    INSERT OR REPLACE INTO attachments (
+        opportunity_id, resource_id, filename, mime_type,
+        file_size, access_level, posted_date, download_url,
+        local_path, downloaded, download_error
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
 class Database:
     """SQLite database for SAM.gov opportunity data"""
 
@@ -28,6 +51,9 @@ class Database:
         with self._get_connection() as conn:
             cursor = conn.cursor()
 
+            # WAL persists in the database file, so it only needs setting once
+            cursor.execute("PRAGMA journal_mode=WAL")
+
             # Main opportunities table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS opportunities (
@@ -122,11 +148,82 @@ class Database:
         """Get a database connection with proper cleanup"""
         conn = sqlite3.connect(self.db_path, timeout=30.0)
         conn.row_factory = sqlite3.Row
+        conn.executescript("""
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-65536;
+            PRAGMA mmap_size=268435456;
+        """)
         try:
             yield conn
         finally:
             conn.close()
 
+    @staticmethod
+    def _opportunity_row(data: Dict[str, Any]) -> tuple:
+        """Build the opportunities row tuple for a scraped record"""
+        # Extract place of performance
+        pop = data.get("placeOfPerformance", {}) or {}
+
+        # Extract award info
+        award = data.get("award", {}) or {}
+
+        return (
+            data.get("opportunityId"),
+            data.get("solicitationNumber"),
+            data.get("title"),
+            data.get("description"),
+            data.get("type"),
+            data.get("typeCode"),
+            data.get("postedDate"),
+            data.get("modifiedDate"),
+            data.get("responseDeadline"),
+            data.get("responseTimeZone"),
+            1 if data.get("isActive") else 0,
+            1 if data.get("isCanceled") else 0,
+            data.get("agencyName"),
+            data.get("subAgencyName"),
+            data.get("officeName"),
+            data.get("naicsCode"),
+            data.get("pscCode"),
+            data.get("setAsideType"),
+            data.get("setAsideDescription"),
+            pop.get("city"),
+            pop.get("state"),
+            pop.get("stateCode"),
+            pop.get("country"),
+            pop.get("countryCode"),
+            data.get("samGovLink"),
+            award.get("amount"),
+            award.get("awardee"),
+            award.get("awardeeUei"),
+            json.dumps(data.get("contacts", [])),
+            json.dumps(data.get("attachments", [])),
+            json.dumps(data),
+            data.get("scrapedAt"),
+        )
+
+    @staticmethod
+    def _attachment_rows(data: Dict[str, Any]) -> List[tuple]:
+        """Build the attachments row tuples for a scraped record"""
+        opp_id = data.get("opportunityId")
+        return [
+            (
+                opp_id,
+                att.get("resourceId"),
+                att.get("filename"),
+                att.get("type"),
+                att.get("size"),
+                att.get("accessLevel"),
+                att.get("postedDate"),
+                att.get("downloadUrl"),
+                att.get("localPath"),
+                1 if att.get("localPath") else 0,
+                att.get("downloadError"),
+            )
+            for att in data.get("attachments", [])
+        ]
+
     def save_opportunity(self, data: Dict[str, Any]) -> bool:
         """
         Save or update an opportunity record.
@@ -136,81 +233,10 @@ class Database:
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
-
-                # Extract place of performance
-                pop = data.get("placeOfPerformance", {}) or {}
-
-                # Extract award info
-                award = data.get("award", {}) or {}
-
-                cursor.execute("""
-                    INSERT OR REPLACE INTO opportunities (
-                        opportunity_id, solicitation_number, title, description,
-                        type, type_code, posted_date, modified_date,
-                        response_deadline, response_timezone, is_active, is_canceled,
-                        agency_name, sub_agency_name, office_name,
-                        naics_code, psc_code, set_aside_type, set_aside_description,
-                        place_city, place_state, place_state_code, place_country, place_country_code,
-                        sam_gov_link, award_amount, award_awardee, award_awardee_uei,
-                        contacts_json, attachments_json, raw_data_json,
-                        scraped_at, updated_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, (
-                    data.get("opportunityId"),
-                    data.get("solicitationNumber"),
-                    data.get("title"),
-                    data.get("description"),
-                    data.get("type"),
-                    data.get("typeCode"),
-                    data.get("postedDate"),
-                    data.get("modifiedDate"),
-                    data.get("responseDeadline"),
-                    data.get("responseTimeZone"),
-                    1 if data.get("isActive") else 0,
-                    1 if data.get("isCanceled") else 0,
-                    data.get("agencyName"),
-                    data.get("subAgencyName"),
-                    data.get("officeName"),
-                    data.get("naicsCode"),
-                    data.get("pscCode"),
-                    data.get("setAsideType"),
-                    data.get("setAsideDescription"),
-                    pop.get("city"),
-                    pop.get("state"),
-                    pop.get("stateCode"),
-                    pop.get("country"),
-                    pop.get("countryCode"),
-                    data.get("samGovLink"),
-                    award.get("amount"),
-                    award.get("awardee"),
-                    award.get("awardeeUei"),
-                    json.dumps(data.get("contacts", [])),
-                    json.dumps(data.get("attachments", [])),
-                    json.dumps(data),
-                    data.get("scrapedAt"),
-                ))
+                cursor.execute(OPPORTUNITY_UPSERT_SQL, self._opportunity_row(data))
 
                 # Save attachments separately
-                for att in data.get("attachments", []):
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO attachments (
-                            opportunity_id, resource_id, filename, mime_type,
-                            file_size, access_level, posted_date, download_url,
-                            local_path, downloaded, download_error
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        data.get("opportunityId"),
-                        att.get("resourceId"),
-                        att.get("filename"),
-                        att.get("type"),
-                        att.get("size"),
-                        att.get("accessLevel"),
-                        att.get("postedDate"),
-                        att.get("downloadUrl"),
-                        att.get("localPath"),
-                        1 if att.get("localPath") else 0,
-                        att.get("downloadError"),
-                    ))
+                cursor.executemany(ATTACHMENT_UPSERT_SQL, self._attachment_rows(data))
 
                 conn.commit()
                 return True
@@ -219,11 +245,61 @@ class Database:
             logger.error(f"Failed to save opportunity {data.get('opportunityId')}: {e}")
             return False
 
+    def save_opportunities_bulk(self, batch: List[Dict[str, Any]]) -> int:
+        """
+        Save or update a batch of opportunity records in one transaction.
+
+        Returns the number of opportunities saved (0 on failure).
+        """
+        if not batch:
+            return 0
+
+        try:
+            # Flatten parent and child rows in one pass so each table gets a
+            # single executemany inside the same transaction
+            opp_rows = []
+            att_rows = []
+            for data in batch:
+                opp_rows.append(self._opportunity_row(data))
+                att_rows.extend(self._attachment_rows(data))
+
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.executemany(OPPORTUNITY_UPSERT_SQL, opp_rows)
+                    saved = cursor.rowcount
+                    if att_rows:
+                        cursor.executemany(ATTACHMENT_UPSERT_SQL, att_rows)
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+                return saved
+
+        except Exception as e:
+            logger.error(f"Failed to save batch of {len(batch)} opportunities: {e}")
+            return 0
+
     def get_scraped_ids(self) -> Set[str]:
         """Get set of all opportunity IDs already scraped"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT opportunity_id FROM opportunities")
+            # Iterate the cursor directly so rows aren't first materialized into a list
+            return {row[0] for row in cursor}
+
+    def get_existing_ids(self, opportunity_ids: List[str]) -> Set[str]:
+        """Get the subset of the given opportunity IDs that are already stored"""
+        if not opportunity_ids:
+            return set()
+        placeholders = ",".join("?" * len(opportunity_ids))
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT opportunity_id FROM opportunities WHERE opportunity_id IN ({placeholders})",
+                opportunity_ids,
+            )
             return {row[0] for row in cursor.fetchall()}
 
     def get_opportunity_count(self) -> int:
@@ -98,12 +98,27 @@ class AnalysisConfig:
 # Database Schema Extension
 # =============================================================================
 
+def _configure_conn(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Apply per-connection SQLite tuning PRAGMAs (WAL is set once in init_analysis_tables)."""
+
+    conn.executescript("""
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-131072;
+        PRAGMA mmap_size=536870912;
+    """)
+    return conn
+
+
 def init_analysis_tables(db_path: str):
     """Add AI analysis tables to the scraper database."""
 
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
+    # WAL persists in the database file, so it only needs setting once
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     # AI Analysis results table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS ai_analysis (
@@ -650,7 +665,7 @@ class AIAnalysisPipeline:
     def get_pending_attachments(self, limit: int = 100) -> List[Dict]:
         """Get PDF attachments that haven't been analyzed yet."""
 
-        conn = sqlite3.connect(self.config.scraper_db)
+        conn = _configure_conn(sqlite3.connect(self.config.scraper_db))
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -858,7 +873,7 @@ class AIAnalysisPipeline:
     def get_stats(self) -> Dict:
         """Get analysis statistics."""
 
-        conn = sqlite3.connect(self.config.scraper_db)
+        conn = _configure_conn(sqlite3.connect(self.config.scraper_db))
         cursor = conn.cursor()
 
         stats = {}
@@ -916,7 +931,7 @@ def export_for_bidking(
     Creates a JSON file that can be imported into BidKing's database.
     """
 
-    conn = sqlite3.connect(db_path)
+    conn = _configure_conn(sqlite3.connect(db_path))
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
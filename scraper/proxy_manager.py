@@ -92,6 +92,11 @@ class ProxyManager:
         self._proxy_queue: deque = deque()
         self._failed_proxies: Dict[Proxy, float] = {}  # proxy -> failure time
 
+        # Pool-wide counters kept alongside per-proxy stats so get_stats()
+        # doesn't have to walk every proxy (215K+) on each call
+        self._total_successes = 0
+        self._total_failures = 0
+
         self._load_proxies()
 
     def _load_proxies(self):
@@ -156,6 +161,7 @@ class ProxyManager:
         with self._lock:
             proxy.stats.successes += 1
             proxy.stats.consecutive_failures = 0
+            self._total_successes += 1
 
     def mark_failure(self, proxy: Proxy, remove_on_max_failures: bool = True):
         """
@@ -166,6 +172,7 @@ class ProxyManager:
         with self._lock:
             proxy.stats.failures += 1
             proxy.stats.consecutive_failures += 1
+            self._total_failures += 1
             proxy.stats.last_failure = time.time()
 
             if remove_on_max_failures and proxy.stats.consecutive_failures >= self.max_consecutive_failures:
@@ -220,13 +227,15 @@ class ProxyManager:
     def get_stats(self) -> Dict:
         """Get overall proxy pool statistics"""
         with self._lock:
-            total_successes = sum(p.stats.successes for p in self._proxies)
-            total_failures = sum(p.stats.failures for p in self._proxies)
+            total_successes = self._total_successes
+            total_failures = self._total_failures
 
+            # Read lengths directly - active_count/failed_count take the
+            # (non-reentrant) lock themselves
             return {
-                "total_proxies": self.total_count,
-                "active_proxies": self.active_count,
-                "failed_proxies": self.failed_count,
+                "total_proxies": len(self._proxies),
+                "active_proxies": len(self._proxy_queue),
+                "failed_proxies": len(self._failed_proxies),
                 "total_requests": total_successes + total_failures,
                 "total_successes": total_successes,
                 "total_failures": total_failures,
@@ -0,0 +1,116 @@
+"""
+Helpers shared by the scraper scripts: per-script log files, proxy
+config, SQLite connection tuning, an asyncio request rate limiter and
+non-blocking streamed file writes.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional
+
+# Optional: async file writes (falls back to writes in a worker thread)
+try:
+    import aiofiles
+    HAS_AIOFILES = True
+except ImportError:
+    HAS_AIOFILES = False
+
+# Set SAM_SQLITE_NO_WAL=1 to keep the rollback journal (network-mounted DBs)
+SQLITE_NO_WAL = os.environ.get("SAM_SQLITE_NO_WAL") == "1"
+
+LOGS_DIR = Path(__file__).parent / 'logs'
+PROXY_FILE = Path(__file__).parent / 'brightdata_proxy.txt'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def get_script_logger(name: str, log_file: str) -> logging.Logger:
+    """
+    Console logging plus a per-script file under logs/.
+
+    The file handler goes on the named logger instead of the root, so
+    scripts run in one process by daily_pipeline.py each keep writing to
+    their own log file.
+    """
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    logger = logging.getLogger(name)
+    LOGS_DIR.mkdir(exist_ok=True)
+    handler = logging.FileHandler(LOGS_DIR / log_file, mode='a')
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(handler)
+    return logger
+
+
+@functools.lru_cache(maxsize=1)
+def get_proxy() -> Optional[str]:
+    """Load residential proxy if available (read once per process)."""
+    if not PROXY_FILE.exists():
+        return None
+    try:
+        lines = PROXY_FILE.read_text().splitlines()
+    except OSError as e:
+        logging.getLogger(__name__).warning(f"Could not read proxy file {PROXY_FILE}: {e}")
+        return None
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#') and ':' in line:
+            parts = line.split(':')
+            if len(parts) >= 4:
+                host, port, user, passwd = parts[0], parts[1], parts[2], parts[3]
+                return f'http://{user}:{passwd}@{host}:{port}'
+    return None
+
+
+def tune_conn(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Apply WAL and throughput PRAGMAs to a new connection."""
+    if not SQLITE_NO_WAL:
+        conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript("""
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-65536;
+        PRAGMA busy_timeout=5000;
+    """)
+    return conn
+
+
+class RateLimiter:
+    """Token bucket: up to `rps` requests per second, bursting to `rps`; waits only when empty."""
+
+    def __init__(self, rps: float):
+        self.rate = rps
+        self.tokens = rps
+        self.last = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def write_stream(response, filepath, chunk_size: int) -> None:
+    """Write a streamed httpx response body to filepath without blocking the event loop."""
+    if HAS_AIOFILES:
+        async with aiofiles.open(filepath, 'wb') as f:
+            async for chunk in response.aiter_bytes(chunk_size):
+                await f.write(chunk)
+        return
+
+    f = await asyncio.to_thread(open, filepath, 'wb')
+    try:
+        async for chunk in response.aiter_bytes(chunk_size):
+            await asyncio.to_thread(f.write, chunk)
+    finally:
+        await asyncio.to_thread(f.close)
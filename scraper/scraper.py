@@ -13,18 +13,28 @@ NO API KEY REQUIRED - Uses SAM.gov internal API endpoints.
 """
 
 import asyncio
+import itertools
+import json
 import logging
+import math
 import random
 import uuid
 import time
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List, Dict, Any, Set
 from pathlib import Path
-from collections import deque
+from collections import OrderedDict
 
 import httpx
 
-from proxy_manager import ProxyManager, create_proxy_manager
+# Faster JSON parsing for API responses (optional)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+from proxy_manager import Proxy, ProxyManager, create_proxy_manager
 from database import Database
 
 # Configure logging
@@ -55,54 +65,81 @@ USER_AGENTS = [
 ]
 
 
+# Headers that are the same on every request (only User-Agent rotates)
+BASE_HEADERS = {
+    "Accept": "application/hal+json, application/json",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://sam.gov/search/",
+    "Origin": "https://sam.gov",
+}
+
+
+def parse_json(content: bytes) -> Any:
+    """Parse a JSON response body, using orjson when available"""
+    if HAS_ORJSON:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
 def get_headers() -> Dict[str, str]:
     """Get request headers with random user agent"""
-    return {
-        "Accept": "application/hal+json, application/json",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://sam.gov/search/",
-        "Origin": "https://sam.gov",
-        "User-Agent": random.choice(USER_AGENTS),
-    }
+    return {**BASE_HEADERS, "User-Agent": random.choice(USER_AGENTS)}
 
 
 def safe_get(obj: Any, *keys, default=None) -> Any:
     """Safely get nested dictionary values"""
     for key in keys:
-        if obj is None or not isinstance(obj, dict):
+        try:
+            obj = obj[key]
+        except (TypeError, KeyError, IndexError):
+            # None, a non-container, or a missing key
             return default
-        obj = obj.get(key)
     return obj if obj is not None else default
 
 
 class StallDetector:
     """Detects when the scraper has stalled and triggers recovery."""
 
+    # Time constant (seconds) for the exponentially-weighted rate average
+    RATE_WINDOW_SECONDS = 10.0
+
     def __init__(self, stall_threshold_seconds: int = 60, min_progress_count: int = 5):
         self.stall_threshold = stall_threshold_seconds
         self.min_progress = min_progress_count
-        self.progress_times: deque = deque(maxlen=100)
-        self.last_progress_time = time.time()
+        self.last_progress_time = time.monotonic()
         self.total_progress = 0
         self.consecutive_failures = 0
         self.max_consecutive_failures = 10
 
+        # EWMA of items/sec, updated in O(1) per progress event. The weight
+        # tracks how much history has accumulated so early rates aren't
+        # biased towards the zero starting value.
+        self._ewma_rate = 0.0
+        self._ewma_weight = 0.0
+        self._last_rate_ts = time.monotonic()
+
     def record_progress(self, count: int = 1):
         """Record that progress was made. count=0 resets timer without incrementing."""
-        now = time.time()
+        now = time.monotonic()
         self.last_progress_time = now
         self.consecutive_failures = 0
         if count > 0:
-            self.progress_times.append(now)
             self.total_progress += count
 
+            dt = now - self._last_rate_ts
+            instant_rate = count / max(dt, 1e-6)
+            alpha = 1 - math.exp(-dt / self.RATE_WINDOW_SECONDS)
+            self._ewma_rate += alpha * (instant_rate - self._ewma_rate)
+            self._ewma_weight += alpha * (1 - self._ewma_weight)
+            self._last_rate_ts = now
+
     def record_failure(self):
         """Record a failure."""
         self.consecutive_failures += 1
 
     def is_stalled(self) -> bool:
         """Check if the scraper appears to be stalled."""
-        elapsed = time.time() - self.last_progress_time
+        elapsed = time.monotonic() - self.last_progress_time
         return elapsed > self.stall_threshold
 
     def should_abort(self) -> bool:
@@ -111,13 +148,9 @@ class StallDetector:
 
     def get_rate(self) -> float:
         """Get recent items per second rate."""
-        if len(self.progress_times) < 2:
+        if self._ewma_weight <= 0:
             return 0.0
-
-        time_span = self.progress_times[-1] - self.progress_times[0]
-        if time_span <= 0:
-            return 0.0
-        return len(self.progress_times) / time_span
+        return self._ewma_rate / self._ewma_weight
 
 
 class SAMScraper:
@@ -154,7 +187,8 @@ class SAMScraper:
 
         # Track state
         self.session_id = str(uuid.uuid4())[:8]
-        self.scraped_ids: Set[str] = set()
+        # IDs processed but not yet committed; the database covers the rest
+        self._unsaved_ids: Set[str] = set()
         self.total_scraped = 0
         self.total_errors = 0
 
@@ -169,137 +203,223 @@ class SAMScraper:
         # Semaphore for rate limiting
         self._semaphore = asyncio.Semaphore(concurrent_requests)
 
+        # Pooled HTTP clients keyed by proxy URL (keeps TLS sessions alive).
+        # LRU-bounded since large proxy pools rarely reuse the same proxy.
+        self._clients: OrderedDict[str, httpx.AsyncClient] = OrderedDict()
+        self._max_clients = max(100, concurrent_requests * 4)
+
         # Pending saves buffer (save in batches)
         self._pending_saves: List[Dict] = []
-        self._save_batch_size = 10
+        self._save_batch_size = 500
+        self._flush_task: Optional[asyncio.Task] = None
 
-    def _flush_pending_saves(self):
-        """Save all pending opportunities to database."""
-        if not self._pending_saves:
-            return
+        # Failed batch saves are re-queued this many times, then saved row by row
+        self._max_save_retries = 3
+        self._save_failures = 0
 
-        saved_count = 0
-        for data in self._pending_saves:
-            if self.db.save_opportunity(data):
-                self.scraped_ids.add(data["opportunityId"])
-                saved_count += 1
+        # Precomputed politeness jitter, cycled on the request hot path
+        self._jitter = itertools.cycle([random.uniform(0, 0.5) for _ in range(4096)])
 
-        if saved_count > 0:
-            self.stall_detector.record_progress(saved_count)
-            self.total_scraped += saved_count
-            logger.info(f"💾 Saved batch of {saved_count} opportunities (Total: {self.total_scraped:,})")
+        # Cache-busting value for search requests
+        self._cache_buster = int(time.time())
 
-        self._pending_saves = []
+        # Checkpoint session progress every N pages
+        self._session_update_pages = 10
+
+    async def _flush_pending_saves(self):
+        """Save all pending opportunities to database from a worker thread."""
+        if not self._pending_saves:
+            return
+
+        batch, self._pending_saves = self._pending_saves, []
+
+        # SQLite commits block, so keep them off the event loop
+        saved_count = await asyncio.to_thread(self.db.save_opportunities_bulk, batch)
+        if saved_count == 0:
+            self._save_failures += 1
+            if self._save_failures < self._max_save_retries:
+                # Batch was rolled back - keep it queued for the next flush
+                logger.warning("⚠️ Batch save failed, re-queued %d opportunities", len(batch))
+                self._pending_saves = batch + self._pending_saves
+                return
+
+            # Keep failing: save row by row so one bad record can't block the rest.
+            # Rows that still fail are dropped (save_opportunity logs them).
+            logger.warning(
+                "⚠️ Batch save failed %d times, saving %d opportunities individually",
+                self._save_failures, len(batch),
+            )
+            saved_count = await asyncio.to_thread(self._save_individually, batch)
+            self.total_errors += len(batch) - saved_count
+
+        self._save_failures = 0
+        self._unsaved_ids.difference_update(data["opportunityId"] for data in batch)
+        self.stall_detector.record_progress(saved_count)
+        self.total_scraped += saved_count
+        logger.info("💾 Saved batch of %d opportunities (Total: %d)", saved_count, self.total_scraped)
+
+    def _save_individually(self, batch: List[Dict]) -> int:
+        """Save each opportunity in its own transaction; returns how many succeeded."""
+        return sum(self.db.save_opportunity(data) for data in batch)
+
+    async def _start_flush(self):
+        """Flush pending saves in the background so scraping can continue."""
+        await self._wait_for_flush()  # SQLite has a single writer
+        if self._pending_saves:
+            self._flush_task = asyncio.create_task(self._flush_pending_saves())
+
+    async def _wait_for_flush(self):
+        """Wait for an in-flight background flush to finish."""
+        if self._flush_task:
+            await self._flush_task
+            self._flush_task = None
+
+    async def _get_client(self, proxy: Proxy) -> httpx.AsyncClient:
+        """Get the pooled client for a proxy, creating it on first use."""
+        client = self._clients.get(proxy.url)
+        if client is not None:
+            self._clients.move_to_end(proxy.url)
+            return client
+
+        if len(self._clients) >= self._max_clients:
+            _, stale = self._clients.popitem(last=False)
+            await stale.aclose()
+
+        client = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            proxy=proxy.url,
+            headers=BASE_HEADERS,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+        self._clients[proxy.url] = client
+        return client
+
+    async def _mark_failure(self, proxy: Proxy):
+        """Mark a proxy failure, dropping its pooled client after repeated strikes."""
+        if proxy.stats.consecutive_failures + 1 >= self.proxy_manager.max_consecutive_failures:
+            client = self._clients.pop(proxy.url, None)
+            if client is not None:
+                await client.aclose()
+        self.proxy_manager.mark_failure(proxy)
+
+    async def close(self):
+        """Close all pooled HTTP clients."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
 
     async def _make_request(
         self,
         client: httpx.AsyncClient,
         url: str,
         params: Optional[Dict] = None,
-        retry_count: int = 0,
     ) -> Optional[Dict]:
         """
         Make an HTTP request with proxy rotation, retry logic, and blocking detection.
+
+        Each attempt uses the next proxy in rotation, up to max_retries retries.
         """
-        proxy = self.proxy_manager.get_proxy()
-        if not proxy:
-            logger.warning("⚠️ No proxies available, trying direct connection...")
-            # Fallback to direct connection without proxy
-            try:
-                async with self._semaphore:
-                    response = await client.get(url, params=params, headers=get_headers())
+        for retry_count in range(self.max_retries + 1):
+            proxy = self.proxy_manager.get_proxy()
+            if not proxy:
+                logger.warning("⚠️ No proxies available, trying direct connection...")
+                # Fallback to direct connection without proxy
+                try:
+                    async with self._semaphore:
+                        response = await client.get(url, params=params, headers=get_headers())
                     response.raise_for_status()
                     await asyncio.sleep(self.request_delay)
-                    return response.json()
-            except Exception as e:
-                logger.error(f"❌ Direct request failed: {e}")
-                return None
+                    return parse_json(response.content)
+                except Exception as e:
+                    logger.error("❌ Direct request failed: %s", e)
+                    return None
 
-        try:
-            async with self._semaphore:
-                # Create a new client with this proxy for this request
-                async with httpx.AsyncClient(
-                    timeout=self.timeout,
-                    follow_redirects=True,
-                    proxy=proxy.url,
-                ) as proxy_client:
+            try:
+                proxy_client = await self._get_client(proxy)
+
+                # Only hold a request slot for the network round trip
+                async with self._semaphore:
                     response = await proxy_client.get(
                         url,
                         params=params,
-                        headers=get_headers(),
+                        headers={"User-Agent": random.choice(USER_AGENTS)},
                     )
 
-                    # Reset consecutive error counters on success
-                    self.consecutive_403s = 0
-                    self.consecutive_timeouts = 0
+                # Reset consecutive error counters on success
+                self.consecutive_403s = 0
+                self.consecutive_timeouts = 0
 
-                    response.raise_for_status()
-                    self.proxy_manager.mark_success(proxy)
-                    await asyncio.sleep(self.request_delay + random.uniform(0, 0.5))
+                response.raise_for_status()
+                self.proxy_manager.mark_success(proxy)
+                await asyncio.sleep(self.request_delay + next(self._jitter))
 
-                    return response.json()
+                return parse_json(response.content)
 
-        except httpx.HTTPStatusError as e:
-            self.proxy_manager.mark_failure(proxy)
-            status_code = e.response.status_code
+            except httpx.HTTPStatusError as e:
+                await self._mark_failure(proxy)
+                status_code = e.response.status_code
 
-            if status_code == 403:
-                self.consecutive_403s += 1
-                self.blocked_proxy_count += 1
-                logger.warning(f"🚫 403 Forbidden (proxy may be blocked) - Count: {self.consecutive_403s}")
+                if status_code == 403:
+                    self.consecutive_403s += 1
+                    self.blocked_proxy_count += 1
+                    logger.warning("🚫 403 Forbidden (proxy may be blocked) - Count: %d", self.consecutive_403s)
 
-                # If we get many 403s, something is wrong
-                if self.consecutive_403s >= 5:
-                    logger.warning("⚠️ Multiple 403s detected - backing off 30s and rotating proxies aggressively")
-                    await asyncio.sleep(30)
-                    self.consecutive_403s = 0
+                    # If we get many 403s, something is wrong
+                    if self.consecutive_403s >= 5:
+                        logger.warning("⚠️ Multiple 403s detected - backing off 30s and rotating proxies aggressively")
+                        await asyncio.sleep(30)
+                        self.consecutive_403s = 0
 
-            elif status_code == 429:  # Rate limited
-                logger.warning(f"⏳ Rate limited (429), backing off... (retry {retry_count + 1})")
-                await asyncio.sleep(10 + random.uniform(0, 10))
+                elif status_code == 429:  # Rate limited
+                    logger.warning("⏳ Rate limited (429), backing off... (retry %d)", retry_count + 1)
+                    await asyncio.sleep(10 + random.uniform(0, 10))
 
-            elif status_code >= 500:
-                logger.warning(f"🔥 Server error {status_code}, retrying...")
-                await asyncio.sleep(2)
-            else:
-                logger.warning(f"HTTP {status_code} error")
+                elif status_code >= 500:
+                    logger.warning("🔥 Server error %d, retrying...", status_code)
+                    await asyncio.sleep(2)
+                else:
+                    logger.warning("HTTP %d error", status_code)
 
-            if retry_count < self.max_retries:
-                return await self._make_request(client, url, params, retry_count + 1)
+                if retry_count < self.max_retries:
+                    continue
 
-            self.stall_detector.record_failure()
-            logger.error(f"❌ Request failed after {retry_count + 1} attempts: HTTP {status_code}")
-            return None
+                self.stall_detector.record_failure()
+                logger.error("❌ Request failed after %d attempts: HTTP %d", retry_count + 1, status_code)
+                return None
 
-        except httpx.TimeoutException as e:
-            self.proxy_manager.mark_failure(proxy)
-            self.consecutive_timeouts += 1
+            except httpx.TimeoutException as e:
+                await self._mark_failure(proxy)
+                self.consecutive_timeouts += 1
 
-            if self.consecutive_timeouts >= 5:
-                logger.warning(f"⚠️ Multiple timeouts ({self.consecutive_timeouts}) - may indicate blocking")
-                await asyncio.sleep(10)
-                self.consecutive_timeouts = 0
+                if self.consecutive_timeouts >= 5:
+                    logger.warning("⚠️ Multiple timeouts (%d) - may indicate blocking", self.consecutive_timeouts)
+                    await asyncio.sleep(10)
+                    self.consecutive_timeouts = 0
 
-            if retry_count < self.max_retries:
-                logger.debug(f"⏱️ Timeout, retrying with different proxy...")
-                await asyncio.sleep(2)
-                return await self._make_request(client, url, params, retry_count + 1)
+                if retry_count < self.max_retries:
+                    logger.debug("⏱️ Timeout, retrying with different proxy...")
+                    await asyncio.sleep(2)
+                    continue
 
-            self.stall_detector.record_failure()
-            logger.error(f"❌ Request timed out after {retry_count + 1} attempts")
-            return None
+                self.stall_detector.record_failure()
+                logger.error("❌ Request timed out after %d attempts", retry_count + 1)
+                return None
 
-        except httpx.RequestError as e:
-            self.proxy_manager.mark_failure(proxy)
+            except httpx.RequestError as e:
+                await self._mark_failure(proxy)
 
-            if retry_count < self.max_retries:
-                logger.debug(f"🔄 Request error, retrying: {type(e).__name__}")
-                await asyncio.sleep(1 + random.uniform(0, 2))
-                return await self._make_request(client, url, params, retry_count + 1)
+                if retry_count < self.max_retries:
+                    logger.debug("🔄 Request error, retrying: %s", type(e).__name__)
+                    await asyncio.sleep(1 + random.uniform(0, 2))
+                    continue
 
-            self.stall_detector.record_failure()
-            logger.error(f"❌ Request failed: {e}")
-            return None
+                self.stall_detector.record_failure()
+                logger.error("❌ Request failed: %s", e)
+                return None
+
+        return None
 
     async def search_page(
         self,
@@ -315,8 +435,10 @@ class SAMScraper:
         Returns:
             Tuple of (results list, total count)
         """
+        # Cache-buster only needs to change between calls, not track the clock
+        self._cache_buster += 1
         params = {
-            "random": int(datetime.now(timezone.utc).timestamp()),
+            "random": self._cache_buster,
             "index": "opp",
             "page": page,
             "mode": "search",
@@ -340,7 +462,7 @@ class SAMScraper:
         results = data.get("_embedded", {}).get("results", [])
         total = data.get("page", {}).get("totalElements", 0)
 
-        logger.info(f"📄 Page {page + 1}: Found {len(results)} opportunities (total: {total:,})")
+        logger.info("📄 Page %d: Found %d opportunities (total: %d)", page + 1, len(results), total)
         return results, total
 
     async def get_opportunity_details(
@@ -364,29 +486,22 @@ class SAMScraper:
         if not data:
             return []
 
-        attachments = []
         attachment_lists = data.get("_embedded", {}).get("opportunityAttachmentList", [])
 
-        for att_list in attachment_lists:
-            for att in att_list.get("attachments", []) or []:
-                if not att or att.get("deletedFlag") == "1":
-                    continue
-
-                resource_id = att.get("resourceId")
-                if not resource_id:
-                    continue
-
-                attachments.append({
-                    "resourceId": resource_id,
-                    "filename": att.get("name", "unknown"),
-                    "type": att.get("mimeType", ""),
-                    "size": att.get("size", 0),
-                    "accessLevel": att.get("accessLevel", "public"),
-                    "postedDate": att.get("postedDate"),
-                    "downloadUrl": f"https://sam.gov/api/prod/opps/v3/opportunities/resources/files/{resource_id}/download",
-                })
-
-        return attachments
+        return [
+            {
+                "resourceId": att["resourceId"],
+                "filename": att.get("name", "unknown"),
+                "type": att.get("mimeType", ""),
+                "size": att.get("size", 0),
+                "accessLevel": att.get("accessLevel", "public"),
+                "postedDate": att.get("postedDate"),
+                "downloadUrl": f"{SAM_RESOURCES_URL}/resources/files/{att['resourceId']}/download",
+            }
+            for att_list in attachment_lists
+            for att in att_list.get("attachments", []) or []
+            if att and att.get("deletedFlag") != "1" and att.get("resourceId")
+        ]
 
     async def process_opportunity(
         self,
@@ -396,9 +511,6 @@ class SAMScraper:
         """Process a single opportunity with details and attachments"""
         opp_id = opp.get("_id", "")
 
-        if opp_id in self.scraped_ids:
-            return None
-
         try:
             # Extract basic data from search result
             org_hierarchy = opp.get("organizationHierarchy", []) or []
@@ -409,14 +521,16 @@ class SAMScraper:
             descriptions = opp.get("descriptions", []) or []
             description = descriptions[0].get("content", "") if descriptions else ""
 
+            opp_type = opp.get("type") or {}
+
             # Build base record
             opportunity_data = {
                 "opportunityId": opp_id,
                 "solicitationNumber": opp.get("solicitationNumber"),
                 "title": opp.get("title"),
                 "description": description,
-                "type": safe_get(opp, "type", "value"),
-                "typeCode": safe_get(opp, "type", "code"),
+                "type": opp_type.get("value"),
+                "typeCode": opp_type.get("code"),
                 "postedDate": opp.get("publishDate"),
                 "modifiedDate": opp.get("modifiedDate"),
                 "responseDeadline": opp.get("responseDate"),
@@ -432,8 +546,16 @@ class SAMScraper:
                 "scrapedAt": datetime.now(timezone.utc).isoformat(),
             }
 
-            # Get detailed data
-            details = await self.get_opportunity_details(client, opp_id)
+            # Details and attachment metadata are independent - fetch both at once
+            details, attachments = await asyncio.gather(
+                self.get_opportunity_details(client, opp_id),
+                self.get_attachments(client, opp_id),
+                return_exceptions=True,
+            )
+            for result in (details, attachments):
+                if isinstance(result, BaseException):
+                    raise result
+
             if details:
                 data2 = details.get("data2", {}) or {}
 
@@ -454,12 +576,14 @@ class SAMScraper:
 
                 # Place of performance
                 pop = data2.get("placeOfPerformance") or {}
+                pop_state = pop.get("state") or {}
+                pop_country = pop.get("country") or {}
                 opportunity_data["placeOfPerformance"] = {
-                    "city": safe_get(pop, "city", "name"),
-                    "state": safe_get(pop, "state", "name"),
-                    "stateCode": safe_get(pop, "state", "code"),
-                    "country": safe_get(pop, "country", "name"),
-                    "countryCode": safe_get(pop, "country", "code"),
+                    "city": (pop.get("city") or {}).get("name"),
+                    "state": pop_state.get("name"),
+                    "stateCode": pop_state.get("code"),
+                    "country": pop_country.get("name"),
+                    "countryCode": pop_country.get("code"),
                 }
 
                 # Contacts
@@ -483,13 +607,13 @@ class SAMScraper:
                         "awardeeUei": awardee.get("ueiSAM") if isinstance(awardee, dict) else None,
                     }
 
-            # Get attachments metadata (not downloading files)
-            opportunity_data["attachments"] = await self.get_attachments(client, opp_id)
+            # Attachments metadata (not downloading files)
+            opportunity_data["attachments"] = attachments
 
             return opportunity_data
 
         except Exception as e:
-            logger.error(f"❌ Error processing {opp_id}: {e}")
+            logger.error("❌ Error processing %s: %s", opp_id, e)
             self.total_errors += 1
             self.stall_detector.record_failure()
             return None
@@ -511,9 +635,9 @@ class SAMScraper:
         logger.info(f"🚀 Starting scrape: {posted_from} to {posted_to}")
         logger.info(f"🔄 Using {self.proxy_manager.active_count:,} proxies")
 
-        # Load already scraped IDs for resume capability
-        self.scraped_ids = self.db.get_scraped_ids()
-        logger.info(f"✅ Already scraped: {len(self.scraped_ids):,} opportunities (will skip)")
+        # Already scraped IDs are checked per page against the database (resume capability)
+        existing_count = self.db.get_opportunity_count()
+        logger.info(f"✅ Already scraped: {existing_count:,} opportunities (will skip)")
 
         # Create session
         self.db.create_session(self.session_id, {
@@ -522,21 +646,20 @@ class SAMScraper:
             "include_inactive": include_inactive,
         })
 
-        # First, get total count
         async with httpx.AsyncClient(timeout=self.timeout) as client:
-            _, total_opportunities = await self.search_page(
+            # First page gives the total count; keep its results for the loop
+            first_page_results, total_opportunities = await self.search_page(
                 client, 0, posted_from, posted_to, include_inactive
             )
 
-        if total_opportunities == 0:
-            logger.warning("⚠️ No opportunities found!")
-            return 0
+            if total_opportunities == 0:
+                logger.warning("⚠️ No opportunities found!")
+                return 0
 
-        logger.info(f"📊 Target: {total_opportunities:,} total opportunities")
-        total_pages = (total_opportunities + self.page_size - 1) // self.page_size
-        logger.info(f"📑 Total pages to scrape: {total_pages:,}")
+            logger.info(f"📊 Target: {total_opportunities:,} total opportunities")
+            total_pages = (total_opportunities + self.page_size - 1) // self.page_size
+            logger.info(f"📑 Total pages to scrape: {total_pages:,}")
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
             page = 0
             stall_recovery_attempts = 0
             max_stall_recoveries = 5
@@ -553,13 +676,14 @@ class SAMScraper:
                         break
 
                     # Recovery: flush saves, back off, and continue
-                    self._flush_pending_saves()
+                    await self._wait_for_flush()
+                    await self._flush_pending_saves()
                     backoff = 30 * stall_recovery_attempts
                     logger.info(f"⏳ Backing off for {backoff} seconds...")
                     await asyncio.sleep(backoff)
 
                     # Reset stall detector
-                    self.stall_detector.last_progress_time = time.time()
+                    self.stall_detector.last_progress_time = time.monotonic()
                     continue
 
                 # Check for too many consecutive failures
@@ -567,17 +691,20 @@ class SAMScraper:
                     logger.error(f"❌ Too many consecutive failures ({self.stall_detector.consecutive_failures}). Aborting.")
                     break
 
-                # Get page of results
-                results, _ = await self.search_page(
-                    client, page, posted_from, posted_to, include_inactive
-                )
+                # Get page of results (page 0 was already fetched for the count)
+                if page == 0 and first_page_results:
+                    results, first_page_results = first_page_results, None
+                else:
+                    results, _ = await self.search_page(
+                        client, page, posted_from, posted_to, include_inactive
+                    )
 
                 if not results:
                     if page == 0:
                         logger.warning("⚠️ No results found on first page!")
                         break
                     # Empty page might mean we're at the end
-                    logger.info(f"📭 Empty page {page + 1}, may have reached end")
+                    logger.info("📭 Empty page %d, may have reached end", page + 1)
                     # Try a couple more pages before giving up
                     empty_pages = 0
                     while empty_pages < 3 and page < total_pages:
@@ -591,66 +718,74 @@ class SAMScraper:
                     if not results:
                         break
 
-                # Count how many are already scraped vs new
-                new_ids = []
-                skipped_ids = []
+                # Count how many are already scraped vs new: one indexed lookup
+                # for the whole page, plus anything still waiting to be saved
+                page_ids = [opp.get("_id") for opp in results if opp.get("_id")]
+                # Off the event loop: a background flush may hold the write lock
+                scraped_on_page = await asyncio.to_thread(self.db.get_existing_ids, page_ids)
+                scraped_on_page.update(self._unsaved_ids.intersection(page_ids))
+
+                # Build tasks for new opportunities in a single pass
+                tasks = []
+                skipped = 0
                 for opp in results:
                     opp_id = opp.get("_id")
-                    if opp_id:
-                        if opp_id in self.scraped_ids:
-                            skipped_ids.append(opp_id)
-                        else:
-                            new_ids.append(opp_id)
+                    if not opp_id:
+                        continue
+                    if opp_id in scraped_on_page:
+                        skipped += 1
+                    else:
+                        tasks.append(self.process_opportunity(client, opp))
 
                 # If all items on this page are already scraped, quickly move to next
-                if not new_ids and skipped_ids:
-                    logger.info(f"⏭️ Page {page + 1}: All {len(skipped_ids)} opportunities already scraped, skipping...")
+                if not tasks and skipped:
+                    logger.info("⏭️ Page %d: All %d opportunities already scraped, skipping...", page + 1, skipped)
                     # Still count this as progress to prevent stall detection
                     self.stall_detector.record_progress(0)  # Record activity but no new items
                     page += 1
                     continue
 
                 # Process new opportunities concurrently
-                tasks = []
-                for opp in results:
-                    opp_id = opp.get("_id")
-                    if opp_id in new_ids:
-                        tasks.append(self.process_opportunity(client, opp))
-
                 if tasks:
-                    logger.info(f"🔄 Processing {len(tasks)} new opportunities on page {page + 1} (skipped {len(skipped_ids)} already done)")
+                    logger.info(
+                        "🔄 Processing %d new opportunities on page %d (skipped %d already done)",
+                        len(tasks), page + 1, skipped,
+                    )
                     processed = await asyncio.gather(*tasks, return_exceptions=True)
 
                     processed_count = 0
                     for data in processed:
                         if isinstance(data, Exception):
-                            logger.error(f"❌ Task exception: {data}")
+                            logger.error("❌ Task exception: %s", data)
                             self.total_errors += 1
                             continue
                         if data:
                             self._pending_saves.append(data)
+                            self._unsaved_ids.add(data["opportunityId"])
                             processed_count += 1
 
                             # Save in batches
                             if len(self._pending_saves) >= self._save_batch_size:
-                                self._flush_pending_saves()
+                                await self._start_flush()
 
                     # Record progress for processed items (critical for stall detection)
                     if processed_count > 0:
                         self.stall_detector.record_progress(processed_count)
-                        logger.debug(f"✅ Recorded {processed_count} items progress")
+                        logger.debug("✅ Recorded %d items progress", processed_count)
 
                     # If we only processed a few items (less than batch size), flush now
                     # This prevents data loss and stalling on sparse pages
                     if len(self._pending_saves) > 0 and len(self._pending_saves) < self._save_batch_size:
-                        self._flush_pending_saves()
+                        await self._start_flush()
 
-                # Update session progress
-                self.db.update_session_progress(self.session_id, page, self.total_scraped)
-                logger.debug(f"📄 Completed page {page + 1}, moving to next page...")
+                # Update session progress (only needed for resume, so not every page;
+                # complete_session records the final state)
+                if (page + 1) % self._session_update_pages == 0:
+                    self.db.update_session_progress(self.session_id, page, self.total_scraped)
+                logger.debug("📄 Completed page %d, moving to next page...", page + 1)
 
-                # Log progress every 5 pages
-                if (page + 1) % 5 == 0 or page == 0:
+                # Log progress every 5 pages (skip the stats work if INFO is off)
+                if ((page + 1) % 5 == 0 or page == 0) and logger.isEnabledFor(logging.INFO):
                     stats = self.proxy_manager.get_stats()
                     progress_pct = (self.total_scraped / total_opportunities * 100) if total_opportunities > 0 else 0
                     rate = self.stall_detector.get_rate()
@@ -676,8 +811,10 @@ class SAMScraper:
 
                 page += 1
 
-        # Flush any remaining saves
-        self._flush_pending_saves()
+        # Flush any remaining saves (a failed batch is retried, then saved row by row)
+        await self._wait_for_flush()
+        while self._pending_saves:
+            await self._flush_pending_saves()
 
         # Complete session
         self.db.complete_session(self.session_id, page + 1, self.total_scraped)
@@ -751,6 +888,8 @@ async def main():
     except KeyboardInterrupt:
         logger.info("⏹️ Scrape interrupted by user")
     finally:
+        await scraper.close()
+
         # Print final stats
         stats = scraper.db.get_stats()
         logger.info("\n=== Final Database Stats ===")
@@ -23,28 +23,59 @@ Usage:
 
 import argparse
 import csv
+import io
+import itertools
 import json
-import logging
+import queue
 import sqlite3
 import sys
+import threading
+from collections import defaultdict
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict, List, Any, Tuple
+from typing import Optional, Dict, Iterator, List, Any, Sequence, Set, Tuple
+
+# Optional: faster JSON encoding
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Optional: C-level CSV parsing
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sam_utils import get_script_logger
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(Path(__file__).parent.parent / 'logs' / 'csv_import.log', mode='a'),
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = get_script_logger(__name__, 'csv_import.log')
 
 # Database path
 DB_PATH = Path(__file__).parent.parent / 'bidking_sam.db'
 
+# SQLITE_MAX_VARIABLE_NUMBER default since SQLite 3.32
+SQLITE_MAX_VARIABLES = 32766
+
+# Upper bound on rows per multi-row INSERT statement
+MAX_ROWS_PER_INSERT = 500
+
+# Bytes per pyarrow CSV block
+ARROW_BLOCK_SIZE = 8 << 20
+
+# Rows buffered per phase before flushing to the database during a CSV read
+WRITE_BATCH_SIZE = 1000
+
+# Parsed batches buffered between the CSV parser thread and the DB writer
+PARSE_QUEUE_SIZE = 8
+
 
 def parse_date(date_str: str) -> Optional[datetime]:
     """Parse various date formats from SAM.gov CSV."""
@@ -64,8 +95,23 @@ def parse_date(date_str: str) -> Optional[datetime]:
         return None
 
 
-def is_future_deadline(deadline_str: str) -> bool:
-    """Check if deadline is in the future."""
+def is_future_deadline(deadline_str: str, now_iso: Optional[str] = None) -> bool:
+    """
+    Check if deadline is in the future.
+
+    When now_iso ('YYYY-MM-DDTHH:MM:SS') is given, well-formed ISO deadlines
+    are compared as strings; anything else goes through parse_date.
+    """
+    if (
+        now_iso
+        and len(deadline_str) >= 19
+        and deadline_str[4] == '-'
+        and deadline_str[7] == '-'
+        and deadline_str[10] in ('T', ' ')
+        and deadline_str[13] == ':'
+    ):
+        return f"{deadline_str[:10]}T{deadline_str[11:19]}" > now_iso
+
     deadline = parse_date(deadline_str)
     if not deadline:
         # If no deadline, include it (might be ongoing)
@@ -73,64 +119,166 @@ def is_future_deadline(deadline_str: str) -> bool:
     return deadline > datetime.now()
 
 
-def build_contacts_json(row: Dict[str, str]) -> str:
+class _Utf8Reader(io.RawIOBase):
+    """
+    Re-encode an already-decoded text file as UTF-8 bytes for pyarrow.
+
+    pyarrow's own transcoding is strict, while the SAM.gov CSV needs
+    cp1252 with errors='replace'.
+    """
+
+    def __init__(self, text_file):
+        self._file = text_file
+        self._buf = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if not self._buf:
+            self._buf = self._file.read(max(1, len(b) // 4)).encode('utf-8')
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+def _skip_invalid_row(row) -> str:
+    logger.warning(f"Skipping malformed CSV row {row.number}: expected {row.expected_columns} columns, got {row.actual_columns}")
+    return 'skip'
+
+
+def read_csv_rows(
+    f, read_stats: Optional[Dict[str, int]] = None
+) -> Tuple[Dict[str, int], Iterator[Sequence[str]]]:
+    """
+    Read a CSV as positional rows instead of DictReader dicts.
+
+    Returns a header->index map and an iterator of rows. Each row carries
+    one trailing '' that columns missing from the header resolve to, so
+    index lookups never raise. Uses pyarrow's streaming reader when
+    installed, csv.reader otherwise. Rows pyarrow drops as malformed are
+    counted in read_stats['malformed_rows'] when read_stats is given.
+    """
+    header = next(csv.reader(f), [])
+    width = len(header)
+    idx = defaultdict(lambda: width, {name: i for i, name in enumerate(header)})
+
+    if HAS_PYARROW:
+        def on_invalid_row(row) -> str:
+            if read_stats is not None:
+                read_stats['malformed_rows'] += 1
+            return _skip_invalid_row(row)
+
+        f.seek(0)
+        reader = pacsv.open_csv(
+            io.BufferedReader(_Utf8Reader(f), ARROW_BLOCK_SIZE),
+            read_options=pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+            parse_options=pacsv.ParseOptions(
+                newlines_in_values=True,
+                invalid_row_handler=on_invalid_row,
+            ),
+            convert_options=pacsv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                strings_can_be_null=False,
+            ),
+        )
+
+        def arrow_rows():
+            for batch in reader:
+                columns = [column.to_pylist() for column in batch.columns]
+                columns.append([''] * batch.num_rows)
+                yield from zip(*columns)
+
+        return idx, arrow_rows()
+
+    reader = csv.reader(f)
+
+    def rows():
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != width:
+                row = (row + [''] * width)[:width]
+            row.append('')
+            yield row
+
+    return idx, rows()
+
+
+def dumps_json(obj: Any) -> str:
+    """Serialize to a JSON string, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def build_contacts_json(row: Sequence[str], idx: Dict[str, int]) -> Optional[str]:
     """Build contacts JSON from CSV row."""
+    has_primary = bool(row[idx['PrimaryContactFullname']] or row[idx['PrimaryContactEmail']])
+    has_secondary = bool(row[idx['SecondaryContactFullname']] or row[idx['SecondaryContactEmail']])
+    if not (has_primary or has_secondary):
+        return None
+
     contacts = []
 
     # Primary contact
-    if row.get('PrimaryContactFullname') or row.get('PrimaryContactEmail'):
+    if has_primary:
         contacts.append({
             'type': 'primary',
-            'title': row.get('PrimaryContactTitle', ''),
-            'name': row.get('PrimaryContactFullname', ''),
-            'email': row.get('PrimaryContactEmail', ''),
-            'phone': row.get('PrimaryContactPhone', ''),
-            'fax': row.get('PrimaryContactFax', ''),
+            'title': row[idx['PrimaryContactTitle']],
+            'name': row[idx['PrimaryContactFullname']],
+            'email': row[idx['PrimaryContactEmail']],
+            'phone': row[idx['PrimaryContactPhone']],
+            'fax': row[idx['PrimaryContactFax']],
         })
 
     # Secondary contact
-    if row.get('SecondaryContactFullname') or row.get('SecondaryContactEmail'):
+    if has_secondary:
         contacts.append({
             'type': 'secondary',
-            'title': row.get('SecondaryContactTitle', ''),
-            'name': row.get('SecondaryContactFullname', ''),
-            'email': row.get('SecondaryContactEmail', ''),
-            'phone': row.get('SecondaryContactPhone', ''),
-            'fax': row.get('SecondaryContactFax', ''),
+            'title': row[idx['SecondaryContactTitle']],
+            'name': row[idx['SecondaryContactFullname']],
+            'email': row[idx['SecondaryContactEmail']],
+            'phone': row[idx['SecondaryContactPhone']],
+            'fax': row[idx['SecondaryContactFax']],
         })
 
-    return json.dumps(contacts) if contacts else None
+    return dumps_json(contacts)
 
 
-def map_csv_to_opportunity(row: Dict[str, str]) -> Dict[str, Any]:
+def map_csv_to_opportunity(
+    row: Sequence[str],
+    idx: Dict[str, int],
+    scraped_at: Optional[str] = None,
+) -> Dict[str, Any]:
     """Map CSV row to database opportunity record."""
     return {
-        'opportunity_id': row.get('NoticeId', ''),
-        'solicitation_number': row.get('Sol#', ''),
-        'title': row.get('Title', ''),
-        'description': row.get('Description', ''),
-        'type': row.get('Type', ''),
-        'type_code': row.get('BaseType', ''),
-        'posted_date': row.get('PostedDate', ''),
-        'response_deadline': row.get('ResponseDeadLine', ''),
+        'opportunity_id': row[idx['NoticeId']],
+        'solicitation_number': row[idx['Sol#']],
+        'title': row[idx['Title']],
+        'description': row[idx['Description']],
+        'type': row[idx['Type']],
+        'type_code': row[idx['BaseType']],
+        'posted_date': row[idx['PostedDate']],
+        'response_deadline': row[idx['ResponseDeadLine']],
         'is_active': 1,
         'is_canceled': 0,
-        'agency_name': row.get('Department/Ind.Agency', ''),
-        'sub_agency_name': row.get('Sub-Tier', ''),
-        'office_name': row.get('Office', ''),
-        'naics_code': row.get('NaicsCode', ''),
-        'psc_code': row.get('ClassificationCode', ''),
-        'set_aside_type': row.get('SetASideCode', ''),
-        'set_aside_description': row.get('SetASide', ''),
-        'place_city': row.get('PopCity', ''),
-        'place_state': row.get('PopState', ''),
-        'place_country': row.get('PopCountry', ''),
-        'sam_gov_link': row.get('Link', ''),
-        'award_amount': float(row['Award$']) if row.get('Award$') else None,
-        'award_awardee': row.get('Awardee', ''),
-        'contacts_json': build_contacts_json(row),
-        'raw_data_json': json.dumps(row),
-        'scraped_at': datetime.now().isoformat(),
+        'agency_name': row[idx['Department/Ind.Agency']],
+        'sub_agency_name': row[idx['Sub-Tier']],
+        'office_name': row[idx['Office']],
+        'naics_code': row[idx['NaicsCode']],
+        'psc_code': row[idx['ClassificationCode']],
+        'set_aside_type': row[idx['SetASideCode']],
+        'set_aside_description': row[idx['SetASide']],
+        'place_city': row[idx['PopCity']],
+        'place_state': row[idx['PopState']],
+        'place_country': row[idx['PopCountry']],
+        'sam_gov_link': row[idx['Link']],
+        'award_amount': float(row[idx['Award$']]) if row[idx['Award$']] else None,
+        'award_awardee': row[idx['Awardee']],
+        'contacts_json': build_contacts_json(row, idx),
+        'scraped_at': scraped_at or datetime.now().isoformat(),
     }
 
 
@@ -149,20 +297,236 @@ def init_queue_table(conn: sqlite3.Connection):
     conn.commit()
 
 
-def get_existing_opportunities(conn: sqlite3.Connection) -> Dict[str, str]:
-    """Get existing opportunity IDs and their posted dates."""
-    cursor = conn.execute("SELECT opportunity_id, posted_date FROM opportunities")
-    return {row[0]: row[1] or '' for row in cursor.fetchall()}
+def configure_connection(conn: sqlite3.Connection, unsafe_fast: bool = False) -> sqlite3.Connection:
+    """
+    Apply bulk-load PRAGMAs to a connection.
+
+    WAL + synchronous=NORMAL stays crash-safe since the DB is shared with the
+    pipeline. unsafe_fast trades durability for speed on one-shot imports.
+    """
+    conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-65536;
+        PRAGMA mmap_size=268435456;
+    """)
+    if unsafe_fast:
+        conn.executescript("""
+            PRAGMA journal_mode=MEMORY;
+            PRAGMA synchronous=OFF;
+        """)
+    return conn
+
+
+@lru_cache(maxsize=None)
+def build_insert_sql(
+    table: str,
+    columns: Tuple[str, ...],
+    or_replace: bool = False,
+) -> Tuple[int, str, str]:
+    """
+    Build the single-row and multi-row INSERT statements for a column set.
+
+    Cached so every flush reuses identical SQL strings, which the sqlite3
+    module's statement cache then serves without re-preparing.
+
+    Returns (rows per multi-row statement, single-row SQL, multi-row SQL).
+    """
+    cols_per_row = len(columns)
+    batch_rows = max(1, min(MAX_ROWS_PER_INSERT, SQLITE_MAX_VARIABLES // cols_per_row))
+    column_names = ', '.join(columns)
+    row_placeholder = '(' + ', '.join(['?'] * cols_per_row) + ')'
+    verb = "INSERT OR REPLACE" if or_replace else "INSERT"
+    single_sql = f"{verb} INTO {table} ({column_names}) VALUES {row_placeholder}"
+    multi_sql = f"{verb} INTO {table} ({column_names}) VALUES " + ', '.join([row_placeholder] * batch_rows)
+    return batch_rows, single_sql, multi_sql
+
+
+def execute_batch(
+    cur: sqlite3.Cursor,
+    sql: str,
+    rows: List[Any],
+    label: str,
+    id_index: int,
+) -> Tuple[int, int]:
+    """
+    Run one statement for all rows with executemany.
+
+    If any row fails, the batch is rolled back to a savepoint and replayed
+    row by row so a single bad record doesn't drop the rest.
+
+    Returns (succeeded, failed) row counts.
+    """
+    cur.execute("SAVEPOINT batch")
+    try:
+        cur.executemany(sql, rows)
+        cur.execute("RELEASE batch")
+        return len(rows), 0
+    except sqlite3.Error:
+        cur.execute("ROLLBACK TO batch")
+        cur.execute("RELEASE batch")
+
+    succeeded = 0
+    failed = 0
+    for row in rows:
+        try:
+            cur.execute(sql, row)
+            succeeded += 1
+        except sqlite3.Error as e:
+            logger.error(f"{label} error for {row[id_index]}: {e}")
+            failed += 1
+    return succeeded, failed
+
+
+def insert_rows(
+    cur: sqlite3.Cursor,
+    table: str,
+    columns: List[str],
+    rows: List[List[Any]],
+    label: str,
+    id_index: int,
+    or_replace: bool = False,
+) -> Tuple[int, int]:
+    """
+    Insert rows using multi-row VALUES statements.
+
+    Full chunks are collapsed into one INSERT each, sized to stay under the
+    SQLite variable limit. The final partial chunk, and any chunk that fails,
+    go through execute_batch with the single-row statement. With or_replace,
+    a row replaces any existing row with the same key.
+
+    Returns (succeeded, failed) row counts.
+    """
+    batch_rows, single_sql, multi_sql = build_insert_sql(table, tuple(columns), or_replace)
+
+    succeeded = 0
+    failed = 0
+    it = iter(rows)
+    while True:
+        chunk = list(itertools.islice(it, batch_rows))
+        if not chunk:
+            break
+
+        if len(chunk) == batch_rows:
+            cur.execute("SAVEPOINT multi_insert")
+            try:
+                cur.execute(multi_sql, list(itertools.chain.from_iterable(chunk)))
+                cur.execute("RELEASE multi_insert")
+                succeeded += len(chunk)
+                continue
+            except sqlite3.Error:
+                cur.execute("ROLLBACK TO multi_insert")
+                cur.execute("RELEASE multi_insert")
+
+        ok, bad = execute_batch(cur, single_sql, chunk, label=label, id_index=id_index)
+        succeeded += ok
+        failed += bad
+
+    return succeeded, failed
+
+
+def init_stage_table(cur: sqlite3.Cursor, columns: List[str]):
+    """
+    Create the temp staging table for a CSV import.
+
+    opportunity_id stays the primary key so a newer repeat of a NoticeId
+    within the CSV replaces the row staged earlier.
+    """
+    other_columns = ', '.join(col for col in columns if col != 'opportunity_id')
+    cur.execute("DROP TABLE IF EXISTS temp.stage_opps")
+    cur.execute(f"CREATE TEMP TABLE stage_opps (opportunity_id TEXT PRIMARY KEY, {other_columns})")
+
+
+def put_until_stopped(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put item on a bounded queue, giving up once stop is set. Returns True if queued."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def parse_csv_batches(
+    csv_path: Path,
+    now_iso: str,
+    scraped_at: str,
+    read_stats: Dict[str, int],
+    active_ids: Optional[Set[str]],
+    batches: queue.Queue,
+    stop: threading.Event,
+):
+    """
+    Read, filter and map CSV rows, pushing lists of mapped rows onto batches.
+
+    Runs on the producer thread of import_csv; read_stats and active_ids
+    are only touched here until the thread is joined.
+    """
+    batch = []
+    seen_posted: Dict[str, str] = {}
+    with open(csv_path, 'r', encoding='cp1252', errors='replace') as f:
+        idx, rows = read_csv_rows(f, read_stats)
+        i_notice_id = idx['NoticeId']
+        i_active = idx['Active']
+        i_deadline = idx['ResponseDeadLine']
+        i_posted_date = idx['PostedDate']
+
+        for row in rows:
+            read_stats['total_rows'] += 1
+
+            opp_id = row[i_notice_id]
+            if not opp_id:
+                read_stats['errors'] += 1
+                continue
+
+            # Filter: Active only
+            if row[i_active].lower() != 'yes':
+                read_stats['skipped_inactive'] += 1
+                continue
+            if active_ids is not None:
+                active_ids.add(opp_id)
+
+            # Filter: Future deadline only
+            deadline = row[i_deadline]
+            if not is_future_deadline(deadline, now_iso):
+                read_stats['skipped_expired'] += 1
+                continue
+
+            # Dedupe within the CSV before mapping: keep the latest PostedDate.
+            # A newer repeat is passed on and replaces the earlier staged row.
+            posted_date = row[i_posted_date]
+            if opp_id in seen_posted:
+                read_stats['skipped_duplicate'] += 1
+                if posted_date <= seen_posted[opp_id]:
+                    continue
+            seen_posted[opp_id] = posted_date
+
+            batch.append(map_csv_to_opportunity(row, idx, scraped_at))
+            if len(batch) >= WRITE_BATCH_SIZE:
+                if not put_until_stopped(batches, batch, stop):
+                    return
+                batch = []
+
+    if batch:
+        put_until_stopped(batches, batch, stop)
 
 
 def import_csv(
     csv_path: Path,
     dry_run: bool = False,
     queue_ai: bool = False,
+    unsafe_fast: bool = False,
+    active_ids: Optional[Set[str]] = None,
 ) -> Dict[str, int]:
     """
     Import opportunities from SAM.gov CSV file.
 
+    If active_ids is given, every active NoticeId seen in the CSV is added
+    to it so mark_stale_inactive can skip re-reading the file. It is only
+    complete if stats['csv_read'] is True and stats['malformed_rows'] is 0.
+
     Returns stats dict with counts of processed records.
     """
     stats = {
@@ -173,120 +537,152 @@ def import_csv(
         'inserted': 0,
         'updated': 0,
         'queued_for_ai': 0,
+        'malformed_rows': 0,
         'errors': 0,
+        'csv_read': False,
     }
 
     if not csv_path.exists():
         logger.error(f"CSV file not found: {csv_path}")
         return stats
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = configure_connection(sqlite3.connect(DB_PATH), unsafe_fast)
     init_queue_table(conn)
-    existing = get_existing_opportunities(conn)
 
-    logger.info(f"Existing opportunities in DB: {len(existing)}")
     logger.info(f"Reading CSV: {csv_path}")
 
-    to_insert = []
-    to_update = []
-    to_queue = []
-
-    # Read and filter CSV
-    with open(csv_path, 'r', encoding='cp1252', errors='replace') as f:
-        reader = csv.DictReader(f)
-
-        for row in reader:
-            stats['total_rows'] += 1
-
-            opp_id = row.get('NoticeId', '')
-            if not opp_id:
-                stats['errors'] += 1
-                continue
-
-            # Filter: Active only
-            if row.get('Active', '').lower() != 'yes':
-                stats['skipped_inactive'] += 1
-                continue
-
-            # Filter: Future deadline only
-            deadline = row.get('ResponseDeadLine', '')
-            if not is_future_deadline(deadline):
-                stats['skipped_expired'] += 1
-                continue
+    columns = []
+
+    # Hoisted out of the row loop: one timestamp per import
+    now = datetime.now()
+    now_iso = now.strftime('%Y-%m-%dT%H:%M:%S')
+    scraped_at = now.isoformat()
+
+    def flush_stage(batch: List[Dict[str, Any]]):
+        """Write a batch of mapped rows to the staging table."""
+        if not columns:
+            columns.extend(batch[0].keys())
+            init_stage_table(cur, columns)
+
+        _, failed = insert_rows(
+            cur,
+            'stage_opps',
+            columns,
+            [[opp[col] for col in columns] for opp in batch],
+            label="Insert",
+            id_index=columns.index('opportunity_id'),
+            or_replace=True,
+        )
+        stats['errors'] += failed
 
-            # Check for duplicates
-            posted_date = row.get('PostedDate', '')
-            if opp_id in existing:
-                if posted_date <= existing[opp_id]:
-                    stats['skipped_duplicate'] += 1
-                    continue
-                else:
-                    # Newer version - update
-                    to_update.append(map_csv_to_opportunity(row))
-            else:
-                # New opportunity
-                to_insert.append(map_csv_to_opportunity(row))
-                to_queue.append(opp_id)
-
-    logger.info(f"Parsed {stats['total_rows']} rows")
-    logger.info(f"Skipped: {stats['skipped_inactive']} inactive, {stats['skipped_expired']} expired, {stats['skipped_duplicate']} duplicates")
-    logger.info(f"To insert: {len(to_insert)}, To update: {len(to_update)}")
-
-    if dry_run:
-        logger.info("DRY RUN - no changes made")
-        stats['inserted'] = len(to_insert)
-        stats['updated'] = len(to_update)
-        conn.close()
-        return stats
+    # Stage filtered rows, then let SQLite dedupe against opportunities with its index.
+    # Writes happen in a single transaction; dry runs only touch the temp table.
+    conn.isolation_level = None
+    cur = conn.cursor()
+    if not dry_run:
+        cur.execute("BEGIN IMMEDIATE")
 
-    # Insert new opportunities
-    if to_insert:
-        columns = list(to_insert[0].keys())
-        placeholders = ', '.join(['?' for _ in columns])
-        column_names = ', '.join(columns)
+    try:
+        # Parse on a producer thread while this thread writes batches to SQLite
+        read_stats = dict.fromkeys(
+            ('total_rows', 'skipped_inactive', 'skipped_expired', 'skipped_duplicate',
+             'malformed_rows', 'errors'), 0
+        )
+        batches = queue.Queue(maxsize=PARSE_QUEUE_SIZE)
+        stop = threading.Event()
+        producer_errors = []
 
-        for opp in to_insert:
-            try:
-                values = [opp[col] for col in columns]
-                conn.execute(
-                    f"INSERT INTO opportunities ({column_names}) VALUES ({placeholders})",
-                    values
-                )
-                stats['inserted'] += 1
-            except sqlite3.Error as e:
-                logger.error(f"Insert error for {opp['opportunity_id']}: {e}")
-                stats['errors'] += 1
-
-    # Update existing opportunities
-    if to_update:
-        for opp in to_update:
+        def produce():
             try:
-                opp_id = opp.pop('opportunity_id')
-                set_clause = ', '.join([f"{k} = ?" for k in opp.keys()])
-                values = list(opp.values()) + [opp_id]
-                conn.execute(
-                    f"UPDATE opportunities SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE opportunity_id = ?",
-                    values
+                parse_csv_batches(csv_path, now_iso, scraped_at, read_stats, active_ids, batches, stop)
+            except BaseException as e:
+                producer_errors.append(e)
+            finally:
+                put_until_stopped(batches, None, stop)
+
+        producer = threading.Thread(target=produce, name='csv-parser', daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                flush_stage(batch)
+        finally:
+            stop.set()
+            producer.join()
+
+        if producer_errors:
+            raise producer_errors[0]
+        for key, count in read_stats.items():
+            stats[key] += count
+        stats['csv_read'] = True
+
+        logger.info(f"Parsed {stats['total_rows']} rows")
+
+        if columns:
+            staged = cur.execute("SELECT COUNT(*) FROM stage_opps").fetchone()[0]
+            new_filter = """
+                NOT EXISTS (SELECT 1 FROM opportunities o WHERE o.opportunity_id = s.opportunity_id)
+            """
+            newer_filter = """
+                EXISTS (
+                    SELECT 1 FROM opportunities o
+                    WHERE o.opportunity_id = s.opportunity_id
+                      AND s.posted_date > COALESCE(o.posted_date, '')
                 )
-                stats['updated'] += 1
-            except sqlite3.Error as e:
-                logger.error(f"Update error for {opp_id}: {e}")
-                stats['errors'] += 1
-
-    # Queue for AI analysis
-    if queue_ai and to_queue:
-        for opp_id in to_queue:
-            try:
-                conn.execute(
-                    "INSERT OR IGNORE INTO import_queue (opportunity_id) VALUES (?)",
-                    (opp_id,)
+            """
+
+            # Cheap pre-check against the staging table for insert/update counts
+            to_insert = cur.execute(
+                f"SELECT COUNT(*) FROM stage_opps s WHERE {new_filter}"
+            ).fetchone()[0]
+            to_update = cur.execute(
+                f"SELECT COUNT(*) FROM stage_opps s WHERE {newer_filter}"
+            ).fetchone()[0]
+
+            if not dry_run:
+                # Queue new opportunities before the upsert so the filter still matches
+                if queue_ai:
+                    stats['queued_for_ai'] = cur.execute(f"""
+                        INSERT OR IGNORE INTO import_queue (opportunity_id)
+                        SELECT s.opportunity_id FROM stage_opps s WHERE {new_filter}
+                    """).rowcount
+
+                # Insert new rows and refresh newer versions in one statement
+                column_names = ', '.join(columns)
+                set_clause = ', '.join(
+                    f"{col} = excluded.{col}" for col in columns if col != 'opportunity_id'
                 )
-                stats['queued_for_ai'] += 1
-            except sqlite3.Error as e:
-                logger.error(f"Queue error for {opp_id}: {e}")
-
-    conn.commit()
-    conn.close()
+                cur.execute(f"""
+                    INSERT INTO opportunities ({column_names})
+                    SELECT {column_names} FROM stage_opps WHERE true
+                    ON CONFLICT(opportunity_id) DO UPDATE SET
+                        {set_clause},
+                        raw_data_json = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE excluded.posted_date > COALESCE(opportunities.posted_date, '')
+                """)
+
+            stats['inserted'] = to_insert
+            stats['updated'] = to_update
+            stats['skipped_duplicate'] += staged - to_insert - to_update
+            cur.execute("DROP TABLE temp.stage_opps")
+
+        logger.info(f"Skipped: {stats['skipped_inactive']} inactive, {stats['skipped_expired']} expired, {stats['skipped_duplicate']} duplicates")
+        logger.info(f"To insert: {stats['inserted']}, To update: {stats['updated']}")
+
+        if dry_run:
+            logger.info("DRY RUN - no changes made")
+            return stats
+
+        cur.execute("COMMIT")
+    except Exception:
+        if not dry_run:
+            cur.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
 
     logger.info(f"Import complete: {stats['inserted']} inserted, {stats['updated']} updated")
     if queue_ai:
@@ -295,45 +691,75 @@ def import_csv(
     return stats
 
 
-def mark_stale_inactive(csv_path: Path, dry_run: bool = False) -> int:
+def mark_stale_inactive(
+    csv_path: Path,
+    dry_run: bool = False,
+    unsafe_fast: bool = False,
+    active_ids: Optional[Set[str]] = None,
+) -> int:
     """
     Mark opportunities that are no longer in the active CSV as inactive.
 
+    Pass the active_ids collected by import_csv to avoid parsing the CSV
+    a second time; otherwise they are read from csv_path. Nothing is marked
+    if any CSV rows had to be dropped as malformed, since their
+    opportunities would look stale.
+
     Returns count of opportunities marked inactive.
     """
-    # Get all active opportunity IDs from CSV
-    csv_ids = set()
-    with open(csv_path, 'r', encoding='cp1252', errors='replace') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('Active', '').lower() == 'yes':
-                csv_ids.add(row.get('NoticeId', ''))
-
-    # Find opportunities in DB that are not in CSV
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.execute(
-        "SELECT opportunity_id FROM opportunities WHERE is_active = 1"
-    )
-    db_ids = {row[0] for row in cursor.fetchall()}
-
-    stale_ids = db_ids - csv_ids
-
-    if dry_run:
-        logger.info(f"DRY RUN - Would mark {len(stale_ids)} opportunities as inactive")
+    if active_ids is not None:
+        csv_ids = active_ids
+    else:
+        # Get all active opportunity IDs from CSV
+        csv_ids = set()
+        read_stats = {'malformed_rows': 0}
+        with open(csv_path, 'r', encoding='cp1252', errors='replace') as f:
+            idx, rows = read_csv_rows(f, read_stats)
+            i_notice_id = idx['NoticeId']
+            i_active = idx['Active']
+            for row in rows:
+                if row[i_active].lower() == 'yes':
+                    csv_ids.add(row[i_notice_id])
+        if read_stats['malformed_rows']:
+            logger.warning(
+                f"Not marking stale opportunities: {read_stats['malformed_rows']} malformed CSV rows were dropped"
+            )
+            return 0
+
+    # Find opportunities in DB that are not in CSV via a temp table join
+    # (no variable-limit bound, no giant IN list to parse)
+    conn = configure_connection(sqlite3.connect(DB_PATH), unsafe_fast)
+    conn.isolation_level = None
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS csv_active (id TEXT PRIMARY KEY)")
+        cur.executemany("INSERT OR IGNORE INTO csv_active (id) VALUES (?)", ((i,) for i in csv_ids))
+
+        stale_filter = "is_active = 1 AND opportunity_id NOT IN (SELECT id FROM csv_active)"
+
+        if dry_run:
+            stale_count = cur.execute(
+                f"SELECT COUNT(*) FROM opportunities WHERE {stale_filter}"
+            ).fetchone()[0]
+            cur.execute("ROLLBACK")
+            logger.info(f"DRY RUN - Would mark {stale_count} opportunities as inactive")
+            return stale_count
+
+        stale_count = cur.execute(
+            f"UPDATE opportunities SET is_active = 0, updated_at = CURRENT_TIMESTAMP WHERE {stale_filter}"
+        ).rowcount
+        cur.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            cur.execute("ROLLBACK")
+        raise
+    finally:
         conn.close()
-        return len(stale_ids)
-
-    if stale_ids:
-        placeholders = ', '.join(['?' for _ in stale_ids])
-        conn.execute(
-            f"UPDATE opportunities SET is_active = 0, updated_at = CURRENT_TIMESTAMP WHERE opportunity_id IN ({placeholders})",
-            list(stale_ids)
-        )
-        conn.commit()
-        logger.info(f"Marked {len(stale_ids)} opportunities as inactive")
 
-    conn.close()
-    return len(stale_ids)
+    if stale_count:
+        logger.info(f"Marked {stale_count} opportunities as inactive")
+    return stale_count
 
 
 def main():
@@ -360,6 +786,11 @@ def main():
         action='store_true',
         help="Mark opportunities not in CSV as inactive"
     )
+    parser.add_argument(
+        '--unsafe-fast',
+        action='store_true',
+        help="Disable journaling and fsync for one-shot imports (not crash-safe)"
+    )
 
     args = parser.parse_args()
 
@@ -367,17 +798,33 @@ def main():
     logger.info("Daily CSV Import Pipeline")
     logger.info("=" * 60)
 
-    # Import new/updated opportunities
+    # Import new/updated opportunities, collecting active IDs in the same pass
+    active_ids = set() if args.mark_stale else None
     stats = import_csv(
         args.csv_file,
         dry_run=args.dry_run,
         queue_ai=args.queue_ai,
+        unsafe_fast=args.unsafe_fast,
+        active_ids=active_ids,
     )
 
     # Optionally mark stale opportunities
     if args.mark_stale:
-        stale_count = mark_stale_inactive(args.csv_file, dry_run=args.dry_run)
-        stats['marked_inactive'] = stale_count
+        if stats['malformed_rows']:
+            logger.warning(
+                f"Not marking stale opportunities: {stats['malformed_rows']} malformed CSV rows were dropped"
+            )
+            stats['marked_inactive'] = 0
+        else:
+            # Only trust the collected IDs if the import actually read the CSV;
+            # otherwise re-read it (and fail loudly if it is missing)
+            stale_count = mark_stale_inactive(
+                args.csv_file,
+                dry_run=args.dry_run,
+                unsafe_fast=args.unsafe_fast,
+                active_ids=active_ids if stats['csv_read'] else None,
+            )
+            stats['marked_inactive'] = stale_count
 
     # Print summary
     print("\n" + "=" * 40)
@@ -393,6 +840,8 @@ def main():
         print(f"Queued for AI:       {stats['queued_for_ai']:,}")
     if args.mark_stale:
         print(f"Marked inactive:     {stats.get('marked_inactive', 0):,}")
+    if stats['malformed_rows']:
+        print(f"Malformed (dropped): {stats['malformed_rows']:,}")
     print(f"Errors:              {stats['errors']:,}")
     print("=" * 40)
 
@@ -44,6 +44,30 @@ def run_step(name: str, cmd: list, timeout: int = None) -> bool:
         return False
 
 
+def run_inprocess_step(name: str, func, *args, timeout: int = None, **kwargs) -> bool:
+    """
+    Run a pipeline step in this process and return success status.
+
+    func may be sync or async; coroutines are run with the given timeout.
+    A step fails if it raises or returns False.
+    """
+    print(f"\n{'='*60}")
+    print(f"STEP: {name}")
+    print(f"{'='*60}\n")
+
+    try:
+        result = func(*args, **kwargs)
+        if asyncio.iscoroutine(result):
+            result = asyncio.run(asyncio.wait_for(result, timeout))
+        return result is not False
+    except asyncio.TimeoutError:
+        print(f"WARNING: {name} timed out")
+        return False
+    except Exception as e:
+        print(f"ERROR: {name} failed: {e}")
+        return False
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Daily SAM.gov import pipeline"
@@ -81,19 +105,25 @@ def main():
     print("=" * 60)
     print(f"CSV: {args.csv_file}")
 
+    # Steps 1-3 run in-process: no interpreter startup or re-imports per step.
+    # Imported lazily so skipped steps don't load their dependencies.
+
     # Step 1: Import CSV
-    success = run_step(
+    from daily_csv_import import import_csv
+    success = run_inprocess_step(
         "Import CSV",
-        [sys.executable, "scripts/daily_csv_import.py", str(args.csv_file), "--queue-ai"],
+        lambda: import_csv(args.csv_file, queue_ai=True)['errors'] == 0,
     )
     if not success:
         print("CSV import failed!")
         return 1
 
     # Step 2: Fetch attachment metadata
-    success = run_step(
+    import fetch_attachments_metadata
+    success = run_inprocess_step(
         "Fetch Attachment Metadata",
-        [sys.executable, "scripts/fetch_attachments_metadata.py", "--limit", "1000"],
+        fetch_attachments_metadata.main,
+        limit=1000,
         timeout=600,  # 10 min timeout
     )
     if not success:
@@ -101,9 +131,10 @@ def main():
 
     # Step 3: Download PDFs
     if not args.skip_download:
-        success = run_step(
+        import download_attachments
+        success = run_inprocess_step(
             "Download PDFs",
-            [sys.executable, "scripts/download_attachments.py"],
+            download_attachments.main,
             timeout=1800,  # 30 min timeout
         )
         if not success:
@@ -111,7 +142,7 @@ def main():
     else:
         print("\nSkipping PDF download (--skip-download)")
 
-    # Step 4: AI Analysis
+    # Step 4: AI Analysis (still a subprocess; its main() parses sys.argv)
     if not args.skip_ai:
         success = run_step(
             "AI Analysis",
@@ -124,6 +124,8 @@ log "----------------------------------------------"
 
 PENDING_EXTRACT=$(sqlite3 bidking_sam.db "SELECT COUNT(*) FROM attachments WHERE pdf_downloaded = 1 AND text_extracted = 0")
 log "PDFs pending extraction: $PENDING_EXTRACT"
+IN_PROGRESS_EXTRACT=$(sqlite3 bidking_sam.db "SELECT COUNT(*) FROM attachments WHERE text_extracted = -1")
+log "PDFs with extraction in progress: $IN_PROGRESS_EXTRACT"
 
 if [ "$PENDING_EXTRACT" -gt 0 ]; then
     python3 two_phase_analyzer.py --phase1 --limit $PDF_LIMIT 2>&1 | tee -a "$LOG_FILE"
@@ -17,43 +17,88 @@ Designed to run as a daily cron job.
 import asyncio
 import sys
 import os
-import logging
 import argparse
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from typing import List, Tuple
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from scraper import SAMScraper
 from database import Database
+from sam_utils import get_script_logger, write_stream
+
+# Optional: HTTP/2 support for httpx (installed by httpx[http2])
+try:
+    import h2  # noqa: F401
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(Path(__file__).parent.parent / 'logs' / f'daily_scrape_{datetime.now().strftime("%Y%m%d")}.log'),
-    ]
-)
-logger = logging.getLogger(__name__)
-
-
-async def download_new_pdfs(db: Database, pdf_dir: Path, limit: int = 1000):
-    """Download PDFs for opportunities that don't have them yet"""
+logger = get_script_logger(__name__, f'daily_scrape_{datetime.now().strftime("%Y%m%d")}.log')
+
+# Max PDF downloads in flight at once
+PDF_DOWNLOAD_CONCURRENCY = 20
+
+# Downloaded PDFs marked in the database per transaction
+PDF_UPDATE_BATCH_SIZE = 100
+
+# Bytes per chunk when streaming a PDF to disk
+PDF_CHUNK_SIZE = 65536
+
+PDF_DOWNLOAD_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0",
+    "Accept": "*/*",
+    "Referer": "https://sam.gov/"
+}
+
+
+def ensure_pending_pdf_index(conn):
+    """
+    Add attachments.is_pdf and the partial index used to pick pending PDFs.
+
+    is_pdf is a virtual generated column, so every ingest path gets it
+    without changes and the non-sargable LIKE is evaluated only when the
+    index is maintained, not on every pick.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(attachments)")
+    existing_cols = {row[1] for row in cursor.fetchall()}
+
+    if 'is_pdf' not in existing_cols:
+        cursor.execute("""
+            ALTER TABLE attachments ADD COLUMN is_pdf INTEGER
+            GENERATED ALWAYS AS (filename LIKE '%.pdf' OR mime_type LIKE '%pdf%') VIRTUAL
+        """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_att_pending ON attachments(id DESC)
+        WHERE pdf_downloaded = 0 AND download_url IS NOT NULL AND is_pdf = 1
+    """)
+    conn.commit()
+
+
+async def download_new_pdfs(
+    db: Database,
+    pdf_dir: Path,
+    limit: int = 1000,
+    concurrency: int = PDF_DOWNLOAD_CONCURRENCY,
+):
+    """Download PDFs for opportunities that don't have them yet, `concurrency` at a time"""
     import httpx
     from proxy_manager import create_proxy_manager
 
-    # Get attachments that need downloading
+    # Get attachments that need downloading (walks idx_att_pending, no scan or sort)
     with db._get_connection() as conn:
+        ensure_pending_pdf_index(conn)
         cursor = conn.cursor()
         cursor.execute("""
             SELECT a.id, a.opportunity_id, a.resource_id, a.filename, a.download_url
             FROM attachments a
             WHERE a.pdf_downloaded = 0
               AND a.download_url IS NOT NULL
-              AND (a.filename LIKE '%.pdf' OR a.mime_type LIKE '%pdf%')
+              AND a.is_pdf = 1
             ORDER BY a.id DESC
             LIMIT ?
         """, (limit,))
@@ -67,11 +112,26 @@ async def download_new_pdfs(db: Database, pdf_dir: Path, limit: int = 1000):
 
     proxy_manager = create_proxy_manager()
     downloaded = 0
-
-    async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
-        for att in attachments:
-            att_id, opp_id, resource_id, filename, url = att
-
+    sem = asyncio.Semaphore(concurrency)
+    completed: List[Tuple[str, int]] = []
+
+    def flush_completed():
+        """Mark all completed downloads in one transaction."""
+        if not completed:
+            return
+        conn.executemany("""
+            UPDATE attachments
+            SET pdf_downloaded = 1, pdf_local_path = ?
+            WHERE id = ?
+        """, completed)
+        conn.commit()
+        completed.clear()
+
+    async def download_one(client: httpx.AsyncClient, att):
+        nonlocal downloaded
+        att_id, opp_id, resource_id, filename, url = att
+
+        async with sem:
             try:
                 # Create opportunity subdirectory
                 opp_dir = pdf_dir / opp_id
@@ -81,40 +141,49 @@ async def download_new_pdfs(db: Database, pdf_dir: Path, limit: int = 1000):
                 proxy = proxy_manager.get_proxy()
                 proxy_url = proxy.url if proxy else None
 
-                response = await client.get(url, headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0",
-                    "Accept": "*/*",
-                    "Referer": "https://sam.gov/"
-                })
+                # Stream the body to disk instead of buffering whole PDFs in memory
+                async with client.stream("GET", url) as response:
+                    if response.status_code != 200:
+                        logger.warning(f"Failed to download {filename}: HTTP {response.status_code}")
+                        return
 
-                if response.status_code == 200:
-                    # Save file
                     safe_filename = filename.replace('/', '_').replace('\\', '_')[:100]
                     file_path = opp_dir / f"{resource_id}_{safe_filename}"
 
-                    with open(file_path, 'wb') as f:
-                        f.write(response.content)
-
-                    # Update database
-                    with db._get_connection() as conn:
-                        cursor = conn.cursor()
-                        cursor.execute("""
-                            UPDATE attachments
-                            SET pdf_downloaded = 1, pdf_local_path = ?
-                            WHERE id = ?
-                        """, (str(file_path), att_id))
-                        conn.commit()
-
-                    downloaded += 1
-                    if downloaded % 50 == 0:
-                        logger.info(f"Downloaded {downloaded}/{len(attachments)} PDFs")
-                else:
-                    logger.warning(f"Failed to download {filename}: HTTP {response.status_code}")
+                    try:
+                        # aiofiles or a worker thread, so a slow disk doesn't stall other downloads
+                        await write_stream(response, file_path, PDF_CHUNK_SIZE)
+                    except BaseException:
+                        # Don't leave a truncated file behind
+                        file_path.unlink(missing_ok=True)
+                        raise
+
+                # Queue the database update for the next batch
+                completed.append((str(file_path), att_id))
+                if len(completed) >= PDF_UPDATE_BATCH_SIZE:
+                    flush_completed()
+
+                downloaded += 1
+                if downloaded % 50 == 0:
+                    logger.info(f"Downloaded {downloaded}/{len(attachments)} PDFs")
 
             except Exception as e:
                 logger.error(f"Error downloading {filename}: {e}")
 
-            await asyncio.sleep(0.5)  # Rate limiting
+    # Bounded concurrency replaces the fixed per-file sleep as the rate limit
+    # One connection for the whole run; updates are flushed every PDF_UPDATE_BATCH_SIZE files
+    with db._get_connection() as conn:
+        try:
+            async with httpx.AsyncClient(
+                http2=HAS_H2,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=30),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                follow_redirects=True,
+                headers=PDF_DOWNLOAD_HEADERS,
+            ) as client:
+                await asyncio.gather(*(download_one(client, att) for att in attachments))
+        finally:
+            flush_completed()
 
     logger.info(f"Downloaded {downloaded} new PDFs")
     return downloaded
@@ -174,6 +243,8 @@ async def main():
     except Exception as e:
         logger.error(f"Scraper error: {e}")
         scraped = 0
+    finally:
+        await scraper.close()
 
     # Download PDFs if requested
     if args.download_pdfs:
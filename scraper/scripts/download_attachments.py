@@ -5,80 +5,205 @@ Focuses on PDFs first, uses residential proxy.
 """
 
 import asyncio
+import os
 import httpx
 import sqlite3
+import sys
 from pathlib import Path
 
+# Optional: HTTP/2 support for httpx (installed by httpx[http2])
+try:
+    import h2  # noqa: F401
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sam_utils import SQLITE_NO_WAL, RateLimiter, get_proxy, tune_conn, write_stream
+
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 DB_PATH = BASE_DIR / "bidking_sam.db"
-PROXY_FILE = BASE_DIR / "brightdata_proxy.txt"
 PDF_DIR = BASE_DIR / "pdfs"
 
+# Max downloads in flight at once
+DOWNLOAD_CONCURRENCY = 16
+
+# Download request rate limit (requests per second)
+DOWNLOAD_RPS = 10
+
 # Ensure PDF directory exists
 PDF_DIR.mkdir(exist_ok=True)
 
 
-def get_proxy():
-    """Load residential proxy if available."""
-    if not PROXY_FILE.exists():
-        return None
+def _chunk_size(path, minimum=1 << 20):
+    """Write size: at least 1 MiB, rounded up to the filesystem block size."""
     try:
-        with open(PROXY_FILE) as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and ':' in line:
-                    parts = line.split(':')
-                    if len(parts) >= 4:
-                        host, port, user, passwd = parts[0], parts[1], parts[2], parts[3]
-                        return f'http://{user}:{passwd}@{host}:{port}'
-    except:
-        pass
-    return None
-
-
-def get_pending_attachments(conn, limit=100, pdf_only=True):
-    """Get attachments that haven't been downloaded yet. Prioritizes import_queue items."""
+        block = os.statvfs(path).f_bsize
+    except (AttributeError, OSError):
+        return minimum
+    if block <= 0:
+        return minimum
+    return -(-minimum // block) * block
+
+
+# aiter_bytes() coalesces network reads up to this size, so a typical PDF
+# costs a handful of write() calls (and thread hand-offs) rather than one
+# per 64 KiB; peak buffer is CHUNK_SIZE per in-flight download.
+CHUNK_SIZE = _chunk_size(PDF_DIR)
+
+
+class _FilenameTable(dict):
+    """str.translate table keeping alphanumerics and '._- ', filled in lazily per code point."""
+
+    def __missing__(self, codepoint):
+        c = chr(codepoint)
+        value = c if c.isalnum() or c in '._- ' else None
+        self[codepoint] = value
+        return value
+
+
+# Shared across calls so each code point is classified once
+_FILENAME_TABLE = _FilenameTable()
+
+# Opportunity folders already known to exist under PDF_DIR
+_created_dirs = set()
+
+
+def ensure_pending_index(conn):
+    """Partial index covering the pending-attachment scan."""
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_attachments_pending
+        ON attachments(downloaded, mime_type, access_level, id)
+        WHERE downloaded IS NULL OR downloaded = 0
+    """)
+    conn.commit()
+
+
+def get_pending_attachments(conn, limit=None, pdf_only=True, batch_size=100):
+    """
+    Get attachments that haven't been downloaded yet. Prioritizes import_queue items.
+
+    Returns the executed cursor (arraysize=batch_size) so callers can page
+    through one sorted result with fetchmany() instead of re-querying.
+    """
     cursor = conn.cursor()
-    # Prioritize new imports (in import_queue) first, then older ones
-    if pdf_only:
-        cursor.execute("""
-            SELECT a.id, a.opportunity_id, a.resource_id, a.filename, a.download_url
-            FROM attachments a
-            LEFT JOIN import_queue q ON a.opportunity_id = q.opportunity_id
-            WHERE (a.downloaded IS NULL OR a.downloaded = 0)
-              AND a.mime_type = '.pdf'
-              AND a.access_level = 'public'
-            ORDER BY CASE WHEN q.opportunity_id IS NOT NULL THEN 0 ELSE 1 END, a.id
-            LIMIT ?
-        """, (limit,))
-    else:
-        cursor.execute("""
-            SELECT a.id, a.opportunity_id, a.resource_id, a.filename, a.download_url
-            FROM attachments a
-            LEFT JOIN import_queue q ON a.opportunity_id = q.opportunity_id
-            WHERE (a.downloaded IS NULL OR a.downloaded = 0)
-              AND a.access_level = 'public'
-            ORDER BY CASE WHEN q.opportunity_id IS NOT NULL THEN 0 ELSE 1 END, a.id
-            LIMIT ?
-        """, (limit,))
-    return cursor.fetchall()
+    cursor.arraysize = batch_size
+    pdf_filter = "AND a.mime_type = '.pdf'" if pdf_only else ""
+    pending = f"""
+        (a.downloaded IS NULL OR a.downloaded = 0)
+        {pdf_filter}
+        AND a.access_level = 'public'
+    """
+    limit = -1 if limit is None else limit
+    # Prioritize new imports (in import_queue) first, then older ones.
+    # Two separately ordered and limited branches instead of ORDER BY CASE,
+    # so each side sorts only its own rows; the literal prio column and the
+    # outer ORDER BY make the branch order explicit rather than relying on
+    # UNION ALL emitting branches in sequence.
+    cursor.execute(f"""
+        SELECT id, opportunity_id, resource_id, filename, download_url FROM (
+            SELECT 0 AS prio, * FROM (
+                SELECT a.id, a.opportunity_id, a.resource_id, a.filename, a.download_url
+                FROM attachments a
+                JOIN import_queue q ON a.opportunity_id = q.opportunity_id
+                WHERE {pending}
+                ORDER BY a.id
+                LIMIT ?
+            )
+            UNION ALL
+            SELECT 1 AS prio, * FROM (
+                SELECT a.id, a.opportunity_id, a.resource_id, a.filename, a.download_url
+                FROM attachments a
+                WHERE {pending}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM import_queue q WHERE q.opportunity_id = a.opportunity_id
+                  )
+                ORDER BY a.id
+                LIMIT ?
+            )
+        )
+        ORDER BY prio, id
+        LIMIT ?
+    """, (limit, limit, limit))
+    return cursor
+
+
+def iter_batches(cursor):
+    """Yield fetchmany() batches until the cursor is exhausted."""
+    while rows := cursor.fetchmany():
+        yield rows
+
+
+def save_results(conn, succeeded, failed):
+    """Record a batch of download outcomes in a single transaction."""
+    if not succeeded and not failed:
+        return
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.executemany(
+            "UPDATE attachments SET local_path = ?, downloaded = 1 WHERE id = ?",
+            succeeded
+        )
+        cursor.executemany(
+            "UPDATE attachments SET downloaded = -1, download_error = ? WHERE id = ?",
+            failed
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
 
 
 async def download_file(client, url, filepath):
     """Download a file from URL."""
     try:
-        response = await client.get(url, follow_redirects=True)
-        response.raise_for_status()
-
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
+        async with client.stream("GET", url, follow_redirects=True) as response:
+            if response.is_error:
+                # Drain the body so the connection goes back to the pool
+                await response.aread()
+                response.raise_for_status()
+
+            # Stream to disk in chunks instead of holding the whole PDF in memory
+            try:
+                await write_stream(response, filepath, CHUNK_SIZE)
+            except BaseException:
+                # Don't leave a truncated file behind
+                filepath.unlink(missing_ok=True)
+                raise
 
         return True
     except Exception as e:
         return str(e)
 
 
+async def download_one(client, sem, limiter, att):
+    """Download one attachment under the semaphore and rate limit. Returns (filepath, safe_filename, result)."""
+    att_id, opp_id, resource_id, filename, download_url = att
+
+    # Create opportunity folder (once per process; opp_ids repeat across files)
+    opp_dir = PDF_DIR / opp_id
+    if opp_id not in _created_dirs:
+        opp_dir.mkdir(exist_ok=True)
+        _created_dirs.add(opp_id)
+
+    # Clean filename
+    safe_filename = filename.translate(_FILENAME_TABLE)[:100]
+    if not safe_filename.endswith('.pdf'):
+        safe_filename += '.pdf'
+
+    # resource_id keeps two same-named attachments of one opportunity,
+    # downloading concurrently, from writing (or unlinking) the same file
+    filepath = opp_dir / f"{resource_id}_{safe_filename}"
+
+    async with sem:
+        await limiter.acquire()
+        result = await download_file(client, download_url, filepath)
+    return filepath, safe_filename, result
+
+
 async def main():
     print("=" * 60)
     print("ATTACHMENT DOWNLOADER")
@@ -90,7 +215,10 @@ async def main():
     else:
         print("No proxy - using direct connection (free!)")
 
-    conn = sqlite3.connect(DB_PATH)
+    # One directory listing up front instead of a mkdir per attachment
+    _created_dirs.update(e.name for e in os.scandir(PDF_DIR) if e.is_dir())
+
+    conn = tune_conn(sqlite3.connect(DB_PATH))
     cursor = conn.cursor()
 
     # Get counts
@@ -113,69 +241,79 @@ async def main():
 
     # Download in batches
     batch_size = 20
+    max_files = 500
     total_downloaded = 0
     total_errors = 0
 
-    async with httpx.AsyncClient(proxy=proxy_url, timeout=120) as client:
-        while True:
-            attachments = get_pending_attachments(conn, limit=batch_size)
-            if not attachments:
-                break
-
+    # One sorted pending query for the whole run, paged with fetchmany().
+    # Updates go through a second connection so they don't disturb the
+    # reader; under WAL the reader keeps its snapshot while the writer commits.
+    ensure_pending_index(conn)
+    writer = tune_conn(sqlite3.connect(DB_PATH))
+    pending = get_pending_attachments(conn, limit=max_files, batch_size=batch_size)
+    if SQLITE_NO_WAL:
+        # Rollback journal: an open read statement would block the writer's commit
+        rows = pending.fetchall()
+        batches = (rows[i:i + batch_size] for i in range(0, len(rows), batch_size))
+    else:
+        batches = iter_batches(pending)
+
+    # Concurrency cap plus token-bucket rate limit (no fixed sleeps)
+    sem = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    limiter = RateLimiter(DOWNLOAD_RPS)
+    limits = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+    timeout = httpx.Timeout(connect=10.0, read=120.0, write=30.0, pool=5.0)
+
+    async with httpx.AsyncClient(
+        proxy=proxy_url, http2=HAS_H2, limits=limits, timeout=timeout
+    ) as client:
+        for attachments in batches:
             print(f"\nProcessing batch of {len(attachments)} files...")
-
-            for att in attachments:
-                att_id, opp_id, resource_id, filename, download_url = att
-
-                # Create opportunity folder
-                opp_dir = PDF_DIR / opp_id
-                opp_dir.mkdir(exist_ok=True)
-
-                # Clean filename
-                safe_filename = "".join(c for c in filename if c.isalnum() or c in '._- ')[:100]
-                if not safe_filename.endswith('.pdf'):
-                    safe_filename += '.pdf'
-
-                filepath = opp_dir / safe_filename
-
-                # Download
-                result = await download_file(client, download_url, filepath)
+            succeeded = []
+            failed = []
+
+            results = await asyncio.gather(
+                *[download_one(client, sem, limiter, att) for att in attachments],
+                return_exceptions=True,
+            )
+
+            for att, outcome in zip(attachments, results):
+                att_id = att[0]
+                if isinstance(outcome, BaseException):
+                    filepath, safe_filename, result = None, att[3] or '', str(outcome)
+                else:
+                    filepath, safe_filename, result = outcome
 
                 if result is True:
-                    # Update database - success
-                    cursor.execute(
-                        "UPDATE attachments SET local_path = ?, downloaded = 1 WHERE id = ?",
-                        (str(filepath), att_id)
-                    )
-                    conn.commit()
+                    succeeded.append((str(filepath), att_id))
                     total_downloaded += 1
                     print(f"  ✓ {safe_filename[:50]}")
                 else:
-                    # Update database - mark as failed so we skip it next time
-                    cursor.execute(
-                        "UPDATE attachments SET downloaded = -1, download_error = ? WHERE id = ?",
-                        (str(result)[:500], att_id)
-                    )
-                    conn.commit()
+                    # Mark as failed so we skip it next time
+                    failed.append((str(result)[:500], att_id))
                     total_errors += 1
                     print(f"  ✗ {safe_filename[:50]}: {result[:50]}")
 
-                # Rate limit
-                await asyncio.sleep(0.2)
+            # One transaction per batch
+            save_results(writer, succeeded, failed)
 
             print(f"Progress: {total_downloaded:,} downloaded, {total_errors:,} errors")
 
             # Safety check
-            if total_downloaded + total_errors >= 500:
-                print("\nReached 500 file limit for this run")
+            if total_downloaded + total_errors >= max_files:
+                print(f"\nReached {max_files} file limit for this run")
                 break
 
+    pending.close()
+    writer.close()
+
     print(f"\n{'=' * 60}")
     print(f"COMPLETE: Downloaded {total_downloaded:,}, Errors {total_errors:,}")
 
     cursor.execute("SELECT COUNT(*) FROM attachments WHERE downloaded = 1")
     print(f"Total downloaded: {cursor.fetchone()[0]:,}")
 
+    conn.execute("PRAGMA optimize")
     conn.close()
 
 
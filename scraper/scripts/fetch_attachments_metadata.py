@@ -17,48 +17,40 @@ Usage:
 
 import argparse
 import asyncio
-import logging
 import sqlite3
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict
 
 import httpx
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sam_utils import RateLimiter, get_script_logger, tune_conn
+
+# Optional: HTTP/2 support for httpx (installed by httpx[http2])
+try:
+    import h2  # noqa: F401
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(Path(__file__).parent.parent / 'logs' / 'fetch_attachments.log', mode='a'),
-    ]
-)
-logger = logging.getLogger(__name__)
+logger = get_script_logger(__name__, 'fetch_attachments.log')
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 DB_PATH = BASE_DIR / "bidking_sam.db"
-PROXY_FILE = BASE_DIR / "brightdata_proxy.txt"
 
 # SAM.gov API
 SAM_RESOURCES_URL = "https://sam.gov/api/prod/opps/v3/opportunities"
 
+# Max metadata requests in flight at once
+FETCH_CONCURRENCY = 8
 
-def get_proxy() -> Optional[str]:
-    """Load residential proxy if available."""
-    if not PROXY_FILE.exists():
-        return None
-    with open(PROXY_FILE) as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and ':' in line:
-                parts = line.split(':')
-                if len(parts) >= 4:
-                    host, port, user, passwd = parts[0], parts[1], parts[2], parts[3]
-                    return f'http://{user}:{passwd}@{host}:{port}'
-    return None
+# Request rate limit for the SAM.gov resources API
+FETCH_RPS = 5
 
 
 def get_queued_opportunities(conn: sqlite3.Connection, limit: int = 500) -> List[str]:
@@ -149,15 +141,35 @@ async def fetch_attachments(
 
 def save_attachments(conn: sqlite3.Connection, attachments: List[Dict]) -> int:
     """Save attachment records to database. Returns count inserted."""
-    inserted = 0
+    # Drop repeats within the response, then rows already stored, so the
+    # insert only touches new (opportunity_id, resource_id) pairs
+    new = {}
     for att in attachments:
-        try:
-            conn.execute("""
-                INSERT OR IGNORE INTO attachments (
-                    opportunity_id, resource_id, filename, mime_type,
-                    file_size, access_level, posted_date, download_url
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+        new.setdefault((att['opportunity_id'], att['resource_id']), att)
+    if not new:
+        return 0
+
+    try:
+        by_opp: Dict[str, List[str]] = {}
+        for opp_id, resource_id in new:
+            by_opp.setdefault(opp_id, []).append(resource_id)
+        for opp_id, resource_ids in by_opp.items():
+            placeholders = ','.join('?' * len(resource_ids))
+            for (resource_id,) in conn.execute(f"""
+                SELECT resource_id FROM attachments
+                WHERE opportunity_id = ? AND resource_id IN ({placeholders})
+            """, (opp_id, *resource_ids)):
+                new.pop((opp_id, resource_id), None)
+        if not new:
+            return 0
+
+        cursor = conn.executemany("""
+            INSERT OR IGNORE INTO attachments (
+                opportunity_id, resource_id, filename, mime_type,
+                file_size, access_level, posted_date, download_url
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
                 att['opportunity_id'],
                 att['resource_id'],
                 att['filename'],
@@ -166,12 +178,13 @@ def save_attachments(conn: sqlite3.Connection, attachments: List[Dict]) -> int:
                 att['access_level'],
                 att['posted_date'],
                 att['download_url'],
-            ))
-            if conn.total_changes:
-                inserted += 1
-        except sqlite3.Error as e:
-            logger.error(f"Error saving attachment: {e}")
-    return inserted
+            )
+            for att in new.values()
+        ])
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Error saving attachments: {e}")
+        return 0
 
 
 def mark_attachments_fetched(conn: sqlite3.Connection, opp_id: str):
@@ -183,21 +196,41 @@ def mark_attachments_fetched(conn: sqlite3.Connection, opp_id: str):
     """, (datetime.now().isoformat(), opp_id))
 
 
+async def fetch_bounded(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    limiter: RateLimiter,
+    opp_id: str,
+) -> List[Dict]:
+    """fetch_attachments, limited to FETCH_CONCURRENCY in flight and FETCH_RPS."""
+    async with sem:
+        await limiter.acquire()
+        return await fetch_attachments(client, opp_id)
+
+
 async def process_batch(
     client: httpx.AsyncClient,
     conn: sqlite3.Connection,
     opp_ids: List[str],
     batch_num: int,
     total_batches: int,
+    sem: asyncio.Semaphore,
+    limiter: RateLimiter,
 ) -> Dict[str, int]:
-    """Process a batch of opportunities sequentially to avoid rate limits."""
-    stats = {'fetched': 0, 'attachments': 0, 'no_attachments': 0, 'errors': 0}
+    """Fetch a batch of opportunities concurrently (bounded by sem), then save them in one commit."""
+    stats = {'fetched': 0, 'attachments': 0, 'inserted': 0, 'no_attachments': 0, 'errors': 0}
+
+    results = await asyncio.gather(
+        *[fetch_bounded(client, sem, limiter, opp_id) for opp_id in opp_ids],
+        return_exceptions=True,
+    )
 
-    for opp_id in opp_ids:
+    for opp_id, attachments in zip(opp_ids, results):
         try:
-            attachments = await fetch_attachments(client, opp_id)
+            if isinstance(attachments, BaseException):
+                raise attachments
             if attachments:
-                save_attachments(conn, attachments)
+                stats['inserted'] += save_attachments(conn, attachments)
                 stats['attachments'] += len(attachments)
             else:
                 stats['no_attachments'] += 1
@@ -205,9 +238,6 @@ async def process_batch(
             mark_attachments_fetched(conn, opp_id)
             stats['fetched'] += 1
 
-            # Small delay between requests to avoid rate limiting
-            await asyncio.sleep(0.2)
-
         except Exception as e:
             logger.error(f"Error for {opp_id}: {e}")
             stats['errors'] += 1
@@ -223,7 +253,7 @@ async def main(limit: int = 500, batch_size: int = 20):
     logger.info("Fetch Attachment Metadata from SAM.gov")
     logger.info("=" * 60)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = tune_conn(sqlite3.connect(DB_PATH))
     init_attachments_table(conn)
 
     # Get queued opportunities
@@ -242,22 +272,23 @@ async def main(limit: int = 500, batch_size: int = 20):
         "Accept-Language": "en-US,en;q=0.9",
     }
 
-    total_stats = {'fetched': 0, 'attachments': 0, 'no_attachments': 0, 'errors': 0}
+    total_stats = {'fetched': 0, 'attachments': 0, 'inserted': 0, 'no_attachments': 0, 'errors': 0}
+
+    # Concurrency cap plus token-bucket rate limit (no fixed sleeps)
+    sem = asyncio.Semaphore(FETCH_CONCURRENCY)
+    limiter = RateLimiter(FETCH_RPS)
 
-    async with httpx.AsyncClient(headers=headers, timeout=30) as client:
+    async with httpx.AsyncClient(headers=headers, timeout=30, http2=HAS_H2) as client:
         # Process in batches
         batches = [opp_ids[i:i+batch_size] for i in range(0, len(opp_ids), batch_size)]
         total_batches = len(batches)
 
         for i, batch in enumerate(batches, 1):
-            stats = await process_batch(client, conn, batch, i, total_batches)
+            stats = await process_batch(client, conn, batch, i, total_batches, sem, limiter)
             for k, v in stats.items():
                 total_stats[k] += v
 
-            # Small delay between batches to be nice to the API
-            if i < total_batches:
-                await asyncio.sleep(1)
-
+    conn.execute("PRAGMA optimize")
     conn.close()
 
     # Print summary
@@ -266,6 +297,7 @@ async def main(limit: int = 500, batch_size: int = 20):
     print("=" * 40)
     print(f"Opportunities processed: {total_stats['fetched']}")
     print(f"Attachments found:       {total_stats['attachments']}")
+    print(f"New attachments saved:   {total_stats['inserted']}")
     print(f"No attachments:          {total_stats['no_attachments']}")
     print(f"Errors:                  {total_stats['errors']}")
     print("=" * 40)
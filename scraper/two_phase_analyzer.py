@@ -22,17 +22,31 @@ This approach:
 import asyncio
 import json
 import logging
+import math
+import mmap
+import os
 import re
 import sqlite3
+import struct
 import subprocess
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, List, Any
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor
 
 import httpx
 
+from sam_utils import tune_conn
+
+# Faster JSON for the BidKing export (optional)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # PDF extraction
 try:
     import pypdf
@@ -67,6 +81,13 @@ try:
 except ImportError:
     HAS_XLSX = False
 
+# calamine (Rust) - much faster than openpyxl, also reads legacy .xls
+try:
+    from python_calamine import CalamineWorkbook
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -77,47 +98,101 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-
 # =============================================================================
 # Magic Byte Detection
 # =============================================================================
 
+# Keyed on the first 4 bytes so detection is a single dict lookup
 MAGIC_BYTES = {
     b'%PDF': 'pdf',
     b'PK\x03\x04': 'zip',  # DOCX, XLSX, PPTX are all ZIP-based
     b'\xd0\xcf\x11\xe0': 'ole',  # Old Office formats (DOC, XLS, PPT)
-    b'{\rtf': 'rtf',
+    b'{\\rt': 'rtf',  # full signature is {\rtf, checked in detect_file_type
 }
 
+# Control bytes that mark a sample as binary: C0 controls other than \t \n \r, plus DEL
+_NON_TEXT_BYTES = bytes(b for b in range(32) if b not in b'\t\n\r') + b'\x7f'
+_TEXT_BYTES = bytes(b for b in range(256) if b not in _NON_TEXT_BYTES)
+
+# Everything except printable ASCII and \t \n \r (for the DOC fallback)
+_NON_PRINTABLE_ASCII = bytes(b for b in range(256) if not (32 <= b < 127 or b in (9, 10, 13)))
+
+
+def is_text_sample(sample: bytes) -> bool:
+    """True if under 5% of sample is control bytes (no decode, so no exception path)."""
+    if not sample:
+        return False
+    return len(sample.translate(None, _TEXT_BYTES)) < 0.05 * len(sample)
+
+
+# Top-level folder of an Office Open XML part -> document type
+OOXML_PREFIXES = ((b'word/', 'docx'), (b'xl/', 'xlsx'), (b'ppt/', 'pptx'))
+
+
+def ooxml_type_from_local_headers(f, max_entries: int = 2) -> Optional[str]:
+    """
+    Classify a ZIP as docx/xlsx/pptx from its first local file header names.
+
+    Office writers put [Content_Types].xml or a word/, xl/ or ppt/ part
+    first, so one or two headers are normally enough. Returns None when
+    undecided (caller falls back to zipfile).
+    """
+    offset = 0
+    for _ in range(max_entries):
+        f.seek(offset)
+        local_header = f.read(30)
+        if len(local_header) < 30 or local_header[:4] != b'PK\x03\x04':
+            return None
+        flags, = struct.unpack_from('<H', local_header, 6)
+        compressed_size, = struct.unpack_from('<I', local_header, 18)
+        name_len, extra_len = struct.unpack_from('<HH', local_header, 26)
+        name = f.read(name_len)
+        for prefix, office_type in OOXML_PREFIXES:
+            if name.startswith(prefix):
+                return office_type
+        # Sizes are unknown with a trailing data descriptor or ZIP64
+        if flags & 0x08 or compressed_size == 0xFFFFFFFF:
+            return None
+        offset += 30 + name_len + extra_len + compressed_size
+    return None
+
+
 def detect_file_type(file_path: Path) -> str:
     """Detect file type by magic bytes, not extension."""
     try:
         with open(file_path, 'rb') as f:
-            header = f.read(16)
-
-        # Check magic bytes
-        if header.startswith(b'%PDF'):
+            # One read serves both the magic-byte check and the text probe
+            sample = f.read(1024)
+            header = sample[:16]
+            kind = MAGIC_BYTES.get(header[:4])
+            if kind == 'zip':
+                # Usually decided by the first entry name, without parsing the central directory
+                office_type = ooxml_type_from_local_headers(f)
+                if office_type:
+                    return office_type
+
+        if kind == 'pdf':
             return 'pdf'
 
-        if header.startswith(b'PK\x03\x04'):
+        if kind == 'zip':
             # ZIP-based format - need to check internal structure
             # DOCX has word/document.xml, XLSX has xl/workbook.xml
             import zipfile
             try:
                 with zipfile.ZipFile(file_path) as zf:
                     names = zf.namelist()
-                    if any('word/' in n for n in names):
+                    if any(n.startswith('word/') for n in names):
                         return 'docx'
-                    elif any('xl/' in n for n in names):
+                    elif any(n.startswith('xl/') for n in names):
                         return 'xlsx'
-                    elif any('ppt/' in n for n in names):
+                    elif any(n.startswith('ppt/') for n in names):
                         return 'pptx'
                     else:
                         return 'zip'
             except:
                 return 'zip'
 
-        if header.startswith(b'\xd0\xcf\x11\xe0'):
+        if kind == 'ole':
             # OLE format - old Office
             # Try to determine if DOC or XLS by extension as fallback
             ext = file_path.suffix.lower()
@@ -125,21 +200,21 @@ def detect_file_type(file_path: Path) -> str:
                 return 'xls'
             return 'doc'  # Default to DOC for OLE
 
-        if header.startswith(b'{\\rtf'):
+        if kind == 'rtf' and header.startswith(b'{\\rtf'):
             return 'rtf'
 
-        # Check if it's plain text (mostly printable ASCII)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                sample = f.read(1000)
-                if sample and all(c.isprintable() or c in '\n\r\t' for c in sample):
-                    return 'txt'
-        except:
-            pass
+        # Readers accept a %PDF header anywhere in the first 1 KB
+        if b'%PDF-' in sample:
+            return 'pdf'
+
+        # Check if it's plain text (almost no control bytes)
+        if is_text_sample(sample):
+            return 'txt'
 
-        # Fallback to extension
+        # Fallback to extension. Not for .pdf: without %PDF no parser can read
+        # it (usually a saved error page), so don't hand it to one.
         ext = file_path.suffix.lower()
-        if ext in ['.pdf', '.docx', '.doc', '.xlsx', '.xls', '.txt', '.rtf']:
+        if ext in ['.docx', '.doc', '.xlsx', '.xls', '.txt', '.rtf']:
             return ext[1:]
 
         return 'unknown'
@@ -149,8 +224,6 @@ def detect_file_type(file_path: Path) -> str:
         return 'unknown'
 
 
-
-
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -170,8 +243,19 @@ class AnalysisConfig:
     max_text_per_doc: int = 20000  # Max chars per document
     max_total_text: int = 60000   # Max total chars for all docs combined
 
+    # Stop PDF extraction after this many chars (None = whole document).
+    # Stored text is also synced to BidKing, so uncapped by default.
+    max_extract_chars: Optional[int] = None
+
     llm_timeout: int = 300  # 5 minutes per analysis
 
+    # Concurrent Phase 2 requests. Ollama queues anything beyond its
+    # OLLAMA_NUM_PARALLEL and queued time counts toward llm_timeout, so
+    # match the server's setting (read from the same env var, default 1)
+    analysis_concurrency: int = field(
+        default_factory=lambda: max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", 1)))
+    )
+
 
 # =============================================================================
 # Database Schema Extension
@@ -180,21 +264,47 @@ class AnalysisConfig:
 def init_tables(db_path: str):
     """Initialize tables for two-phase analysis."""
 
-    conn = sqlite3.connect(db_path)
+    conn = tune_conn(sqlite3.connect(db_path))
     cursor = conn.cursor()
 
+    # All schema changes in one transaction (one journal sync, all-or-nothing)
+    cursor.execute("BEGIN IMMEDIATE")
+
     # Extended attachments table for text extraction
-    cursor.execute("PRAGMA table_info(attachments)")
-    existing_cols = {row[1] for row in cursor.fetchall()}
-
-    if 'text_extracted' not in existing_cols:
-        cursor.execute("ALTER TABLE attachments ADD COLUMN text_extracted INTEGER DEFAULT 0")
-    if 'extracted_text' not in existing_cols:
-        cursor.execute("ALTER TABLE attachments ADD COLUMN extracted_text TEXT")
-    if 'detected_type' not in existing_cols:
-        cursor.execute("ALTER TABLE attachments ADD COLUMN detected_type TEXT")
-    if 'extraction_error' not in existing_cols:
-        cursor.execute("ALTER TABLE attachments ADD COLUMN extraction_error TEXT")
+    existing_cols = {row[1] for row in cursor.execute("PRAGMA table_info(attachments)")}
+
+    for col, ddl in (
+        ('text_extracted', 'INTEGER DEFAULT 0'),
+        ('extracted_text', 'TEXT'),
+        ('detected_type', 'TEXT'),
+        ('extraction_error', 'TEXT'),
+        ('extraction_started_at', 'TEXT'),
+    ):
+        if col not in existing_cols:
+            cursor.execute(f"ALTER TABLE attachments ADD COLUMN {col} {ddl}")
+
+    existing_indexes = {row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'attachments'"
+    )}
+
+    # Phase 2 picker: text_extracted = 1, DISTINCT opportunity_id.
+    # Supersedes the single-column idx_att_text_extracted.
+    cursor.execute("DROP INDEX IF EXISTS idx_att_text_extracted")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_att_text_opp
+        ON attachments(text_extracted, opportunity_id)
+    """)
+    new_indexes = {'idx_att_text_opp'}
+
+    # Phase 1 picker: only not-yet-extracted downloads, already in id order.
+    # pdf_downloaded comes from local_ai_analyzer's migration.
+    if 'pdf_downloaded' in existing_cols:
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_att_extract_pending
+            ON attachments(id)
+            WHERE pdf_downloaded = 1 AND (text_extracted = 0 OR text_extracted IS NULL)
+        """)
+        new_indexes.add('idx_att_extract_pending')
 
     # Per-OPPORTUNITY AI analysis (not per-document)
     cursor.execute("""
@@ -229,6 +339,10 @@ def init_tables(db_path: str):
         ON opportunity_analysis(status)
     """)
 
+    # Give the planner statistics for indexes created just now
+    if new_indexes - existing_indexes:
+        cursor.execute("ANALYZE attachments")
+
     conn.commit()
     conn.close()
     logger.info(f"Initialized two-phase analysis tables in {db_path}")
@@ -238,6 +352,68 @@ def init_tables(db_path: str):
 # Phase 1: Text Extraction
 # =============================================================================
 
+# Phase 1 results are written in batches of this many documents per commit
+EXTRACT_COMMIT_BATCH = 200
+
+# Upper bound on documents sent to a pool worker per task
+EXTRACT_CHUNKSIZE = 32
+
+# Documents are marked text_extracted = -1 just before extraction, and a live
+# run re-stamps extraction_started_at on its unfinished documents every
+# EXTRACT_HEARTBEAT_SECONDS. Rows not stamped for EXTRACT_STALE_MINUTES
+# belong to a run that died: they are retried once, then recorded as failed
+# so a file that crashes the extractor can't wedge every later run.
+EXTRACT_STALE_MINUTES = 10
+EXTRACT_HEARTBEAT_SECONDS = 60
+EXTRACT_INTERRUPTED = 'Extraction interrupted'
+
+# Files above this size are read block-wise / via mmap instead of one read()
+READ_BLOCK_SIZE = 1 << 20
+
+# Files smaller than this are error pages or empty downloads, not documents
+MIN_EXTRACT_BYTES = 512
+
+# Above this size a .doc that antiword/catdoc can't read isn't worth scanning
+# for ASCII runs; the result would be mostly binary noise
+DOC_FALLBACK_MAX_BYTES = 5 << 20
+
+# A PDF is treated as scanned when, after the first 20% of its pages (and
+# at least SCANNED_MIN_PAGES), fewer than 10% of them produced any text.
+# Shorter PDFs are always read in full: an image-only SF-1449/SF-30 cover
+# page shouldn't decide the verdict for the text pages behind it.
+SCANNED_MIN_PAGES = 5
+SCANNED_SAMPLE_FRACTION = 0.2
+SCANNED_TEXT_RATIO = 0.1
+
+
+class ScannedPDFError(Exception):
+    """Raised when a PDF has no usable text layer (needs OCR).
+
+    text holds whatever was extracted before the check tripped.
+    """
+
+    def __init__(self, message: str, text: str = ""):
+        super().__init__(message)
+        self.text = text
+
+
+def scanned_reason(pages_seen: int, pages_with_text: int, total_pages: int) -> Optional[str]:
+    """Why the PDF looks scanned once the sample is complete, else None."""
+    if total_pages < SCANNED_MIN_PAGES:
+        return None
+    sample = max(SCANNED_MIN_PAGES, math.ceil(total_pages * SCANNED_SAMPLE_FRACTION))
+    if pages_seen == sample and pages_with_text < SCANNED_TEXT_RATIO * pages_seen:
+        return f"{pages_with_text}/{pages_seen} sampled pages had text"
+    return None
+
+
+def scanned_result(att_id: int, e: ScannedPDFError) -> tuple:
+    """Result row for a scanned PDF, keeping any text read before it was flagged."""
+    if len(e.text) >= 50:
+        return (att_id, e.text, 'pdf_scanned', f'Scanned PDF, partial text, needs OCR ({e})')
+    return (att_id, None, 'pdf_scanned', f'Scanned PDF, needs OCR ({e})')
+
+
 class TextExtractor:
     """Phase 1: Extract text from all downloaded documents."""
 
@@ -245,13 +421,17 @@ class TextExtractor:
         self.config = config
         self.pdf_dir = Path(config.pdf_dir)
 
-    def extract_text(self, file_path: Path) -> Optional[str]:
-        """Extract text from any document type using magic byte detection."""
+    def extract_text(self, file_path: Path, file_type: Optional[str] = None) -> Optional[str]:
+        """Extract text from any document type using magic byte detection.
+
+        Pass file_type if the caller already ran detect_file_type on this path.
+        """
 
         if not file_path.exists():
             return None
 
-        file_type = detect_file_type(file_path)
+        if file_type is None:
+            file_type = detect_file_type(file_path)
         logger.debug(f"Detected {file_path.name} as {file_type}")
 
         text = None
@@ -277,37 +457,80 @@ class TextExtractor:
         return text.strip() if text else None
 
     def _extract_pdf(self, path: Path) -> Optional[str]:
-        """Extract text from PDF using pdfplumber (thread-safe) with pypdf fallback."""
+        """Extract text from PDF using PyMuPDF, falling back to pdfplumber then pypdf.
+
+        Raises ScannedPDFError for image-only PDFs instead of re-parsing them
+        with every library.
+        """
         text = ""
+        pages_done = 0
+
+        # PyMuPDF isn't thread-safe, but Phase 1 runs in worker processes.
+        # The slower libraries are only tried if fitz fails or finds no text.
+        if HAS_FITZ:
+            try:
+                fitz_text = self._extract_pdf_fitz(path)
+                if fitz_text:
+                    return fitz_text
+            except ScannedPDFError:
+                raise
+            except Exception as e:
+                logger.debug(f"PyMuPDF failed: {e}")
 
-        # NOTE: PyMuPDF (fitz) is faster but NOT thread-safe with ThreadPoolExecutor
-        # Using pdfplumber as primary which is thread-safe
         if HAS_PDFPLUMBER:
             try:
                 with pdfplumber.open(path) as pdf:
+                    total_pages = len(pdf.pages)
+                    with_text = 0
                     for page in pdf.pages:
                         page_text = page.extract_text()
+                        pages_done += 1
                         if page_text:
                             text += page_text + "\n\n"
+                            with_text += 1
+                        reason = scanned_reason(pages_done, with_text, total_pages)
+                        if reason:
+                            raise ScannedPDFError(reason, text.strip())
                 if text.strip():
                     return text.strip()
+            except ScannedPDFError:
+                raise
             except Exception as e:
-                logger.debug(f"pdfplumber failed: {e}")
+                # Keep what was extracted; pypdf picks up from the failing page
+                logger.debug(f"pdfplumber failed after {pages_done} pages: {e}")
 
         # Final fallback to pypdf
         if HAS_PYPDF:
             try:
                 reader = pypdf.PdfReader(path)
-                for page in reader.pages:
+                for page in reader.pages[pages_done:]:
                     page_text = page.extract_text()
                     if page_text:
                         text += page_text + "\n\n"
-                if text.strip():
-                    return text.strip()
             except Exception as e:
                 logger.debug(f"pypdf failed: {e}")
 
-        return None
+        return text.strip() or None
+
+    def _extract_pdf_fitz(self, path: Path) -> Optional[str]:
+        """Extract text with PyMuPDF, stopping once max_extract_chars is reached (if set)."""
+        cap = self.config.max_extract_chars
+        parts = []
+        total = 0
+        with fitz.open(path) as doc:
+            total_pages = doc.page_count
+            for pages_done, page in enumerate(doc, 1):
+                page_text = page.get_text("text")
+                if page_text.strip():
+                    parts.append(page_text)
+                    total += len(page_text)
+                    if cap and total >= cap:
+                        break
+                reason = scanned_reason(pages_done, len(parts), total_pages)
+                if reason:
+                    raise ScannedPDFError(reason, "\n\n".join(parts).strip())
+        text = "\n\n".join(parts).strip()
+        return text or None
 
     def _extract_docx(self, path: Path) -> Optional[str]:
         """Extract text from DOCX."""
@@ -318,13 +541,15 @@ class TextExtractor:
             doc = DocxDocument(path)
             text_parts = []
 
+            # .text is rebuilt from the XML runs on every access, so read it once
             for para in doc.paragraphs:
-                if para.text.strip():
-                    text_parts.append(para.text)
+                para_text = para.text
+                if para_text.strip():
+                    text_parts.append(para_text)
 
             for table in doc.tables:
                 for row in table.rows:
-                    row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+                    row_text = [t for t in (cell.text.strip() for cell in row.cells) if t]
                     if row_text:
                         text_parts.append(" | ".join(row_text))
 
@@ -334,32 +559,44 @@ class TextExtractor:
             return None
 
     def _extract_doc(self, path: Path) -> Optional[str]:
-        """Extract text from old DOC format."""
-        try:
-            result = subprocess.run(
-                ['antiword', str(path)],
-                capture_output=True, text=True, timeout=30
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return result.stdout.strip()
-        except:
-            pass
+        """Extract text from old DOC format (antiword, then catdoc, then raw ASCII)."""
+        for tool in ('antiword', 'catdoc'):
+            try:
+                result = subprocess.run(
+                    [tool, str(path)],
+                    capture_output=True, text=True, timeout=30
+                )
+                if result.returncode == 0 and result.stdout.strip():
+                    return result.stdout.strip()
+            except (OSError, subprocess.SubprocessError):
+                pass
+
+        if path.stat().st_size > DOC_FALLBACK_MAX_BYTES:
+            return None
 
-        # Fallback: extract printable ASCII
+        # Fallback: extract printable ASCII. Filter block by block so only the
+        # (much smaller) printable remainder of a large binary is held in memory.
         try:
+            kept = []
             with open(path, 'rb') as f:
-                content = f.read()
-                text = ''.join(chr(b) for b in content if 32 <= b < 127 or b in (10, 13, 9))
-                text = ' '.join(text.split())
-                if len(text) > 100:
-                    return text
+                while block := f.read(READ_BLOCK_SIZE):
+                    kept.append(block.translate(None, _NON_PRINTABLE_ASCII))
+            text = b' '.join(b''.join(kept).split()).decode('ascii')
+            if len(text) > 100:
+                return text
         except:
             pass
 
         return None
 
     def _extract_xlsx(self, path: Path) -> Optional[str]:
-        """Extract text from XLSX/XLS."""
+        """Extract text from XLSX/XLS using calamine, falling back to openpyxl."""
+        if HAS_CALAMINE:
+            try:
+                return self._extract_xlsx_calamine(path)
+            except Exception as e:
+                logger.debug(f"calamine failed: {e}")
+
         if not HAS_XLSX:
             return None
 
@@ -371,11 +608,12 @@ class TextExtractor:
                 sheet = wb[sheet_name]
                 text_parts.append(f"=== Sheet: {sheet_name} ===")
 
-                for row in sheet.iter_rows():
-                    row_values = []
-                    for cell in row:
-                        if cell.value is not None:
-                            row_values.append(str(cell.value).strip())
+                # values_only skips building a Cell object per cell
+                for row in sheet.iter_rows(values_only=True):
+                    row_values = [
+                        v.strip() if isinstance(v, str) else str(v)
+                        for v in row if v is not None
+                    ]
                     if row_values:
                         text_parts.append(" | ".join(row_values))
 
@@ -385,8 +623,32 @@ class TextExtractor:
             logger.debug(f"XLSX extraction failed: {e}")
             return None
 
+    def _extract_xlsx_calamine(self, path: Path) -> str:
+        """Extract text with calamine, in the same layout as the openpyxl path."""
+        wb = CalamineWorkbook.from_path(str(path))
+        text_parts = []
+
+        for sheet_name in wb.sheet_names:
+            text_parts.append(f"=== Sheet: {sheet_name} ===")
+
+            # Empty cells come back as "" and every number as a float
+            for row in wb.get_sheet_by_name(sheet_name).to_python():
+                row_values = [
+                    v.strip() if isinstance(v, str)
+                    else str(int(v)) if isinstance(v, float) and v.is_integer()
+                    else str(v)
+                    for v in row if v != ""
+                ]
+                if row_values:
+                    text_parts.append(" | ".join(row_values))
+
+        return "\n".join(text_parts)
+
     def _extract_txt(self, path: Path) -> Optional[str]:
         """Extract text from plain text file."""
+        if path.stat().st_size > READ_BLOCK_SIZE:
+            return self._extract_txt_mmap(path)
+
         for encoding in ['utf-8', 'latin-1', 'cp1252']:
             try:
                 with open(path, 'r', encoding=encoding) as f:
@@ -395,10 +657,71 @@ class TextExtractor:
                 continue
         return None
 
+    def _extract_txt_mmap(self, path: Path) -> Optional[str]:
+        """Large-file _extract_txt: decode straight from a read-only mmap (no bytes copy)."""
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for encoding in ['utf-8', 'latin-1', 'cp1252']:
+                try:
+                    text = str(mm, encoding)
+                except UnicodeDecodeError:
+                    continue
+                # Same newline handling as text-mode open()
+                if '\r' in text:
+                    text = text.replace('\r\n', '\n').replace('\r', '\n')
+                return text
+        return None
+
+    def requeue_stale_documents(self, conn: sqlite3.Connection):
+        """Retry documents left in progress by a crashed run, or give up on second crash."""
+        stale = f"text_extracted = -1 AND extraction_started_at < datetime('now', '-{EXTRACT_STALE_MINUTES} minutes')"
+
+        # Second crash on the same document: record it as failed
+        failed = conn.execute(f"""
+            UPDATE attachments
+            SET text_extracted = 1, detected_type = 'error',
+                extraction_error = 'Extraction crashed twice, skipped'
+            WHERE {stale} AND extraction_error = ?
+        """, (EXTRACT_INTERRUPTED,)).rowcount
+
+        retried = conn.execute(f"""
+            UPDATE attachments
+            SET text_extracted = 0, extraction_error = ?
+            WHERE {stale}
+        """, (EXTRACT_INTERRUPTED,)).rowcount
+
+        conn.commit()
+        if failed or retried:
+            logger.warning(f"Interrupted extractions: {retried} requeued, {failed} marked failed")
+
+    def mark_in_progress(self, conn: sqlite3.Connection, att_ids: List[int]):
+        """Flag a batch as being extracted (text_extracted = -1) in one statement."""
+        if not att_ids:
+            return
+        placeholders = ','.join('?' * len(att_ids))
+        conn.execute(f"""
+            UPDATE attachments
+            SET text_extracted = -1, extraction_started_at = datetime('now')
+            WHERE id IN ({placeholders})
+        """, att_ids)
+        conn.commit()
+
+    def touch_in_progress(self, conn: sqlite3.Connection, att_ids: List[int]):
+        """Heartbeat: re-stamp unfinished documents so another run won't requeue them."""
+        if not att_ids:
+            return
+        placeholders = ','.join('?' * len(att_ids))
+        conn.execute(f"""
+            UPDATE attachments
+            SET extraction_started_at = datetime('now')
+            WHERE text_extracted = -1 AND id IN ({placeholders})
+        """, att_ids)
+        conn.commit()
+
     def get_pending_documents(self, limit: int = 1000) -> List[Dict]:
         """Get downloaded documents that haven't had text extracted."""
 
-        conn = sqlite3.connect(self.config.scraper_db)
+        conn = tune_conn(sqlite3.connect(self.config.scraper_db))
+        self.requeue_stale_documents(conn)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -418,53 +741,55 @@ class TextExtractor:
         conn.close()
         return results
 
-    def save_extracted_text(self, att_id: int, text: Optional[str],
-                           detected_type: str, error: Optional[str] = None):
-        """Save extracted text to database."""
-
-        conn = sqlite3.connect(self.config.scraper_db)
-        cursor = conn.cursor()
+    def save_extracted_texts(self, conn: sqlite3.Connection, rows: List[tuple]):
+        """Save a batch of (att_id, text, detected_type, error) results in one commit."""
+        if not rows:
+            return
 
-        cursor.execute("""
+        conn.executemany("""
             UPDATE attachments
             SET text_extracted = 1,
                 extracted_text = ?,
                 detected_type = ?,
                 extraction_error = ?
             WHERE id = ?
-        """, (text, detected_type, error, att_id))
+        """, [(text, detected_type, error, att_id) for att_id, text, detected_type, error in rows])
 
         conn.commit()
-        conn.close()
-
+        rows.clear()
 
     def _process_single_doc(self, doc: Dict) -> tuple:
         """Process a single document for text extraction."""
         file_path = Path(doc['pdf_local_path'])
         att_id = doc['id']
 
-        if not file_path.exists():
+        try:
+            size = file_path.stat().st_size
+        except FileNotFoundError:
             return (att_id, None, 'missing', 'File not found')
+        if size < MIN_EXTRACT_BYTES:
+            return (att_id, None, 'too_small', 'File too small')
 
         try:
             file_type = detect_file_type(file_path)
-            text = self.extract_text(file_path)
+            text = self.extract_text(file_path, file_type)
 
             if text and len(text) >= 50:
                 return (att_id, text, file_type, None)
             else:
                 return (att_id, None, file_type, 'No extractable text')
+        except ScannedPDFError as e:
+            return scanned_result(att_id, e)
         except Exception as e:
             return (att_id, None, 'error', str(e))
 
-    def run_extraction(self, limit: int = 10000, workers: int = 16):
+    def run_extraction(self, limit: int = 10000, workers: Optional[int] = None):
         """Run Phase 1: Extract text from all pending documents using process pool.
 
-        Uses ProcessPoolExecutor instead of ThreadPoolExecutor for PyMuPDF thread safety.
-        Default 8 workers to avoid memory bloat.
+        Extraction is CPU-bound and holds the GIL, so it runs in worker
+        processes (one per CPU by default); database writes stay here.
         """
-        from concurrent.futures import ProcessPoolExecutor, as_completed
-        import os
+        workers = workers or os.cpu_count() or 1
 
         logger.info("=" * 60)
         logger.info("PHASE 1: Text Extraction (Parallel - ProcessPool)")
@@ -482,31 +807,59 @@ class TextExtractor:
         failed = 0
         processed = 0
 
-        # Use ThreadPoolExecutor for parallel extraction
-        # Note: PyMuPDF (fitz) has threading issues - falls back to pdfplumber/pypdf which are thread-safe
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            # Submit all tasks
-            future_to_doc = {executor.submit(self._process_single_doc, doc): doc for doc in docs}
+        # One connection for the run; results are committed EXTRACT_COMMIT_BATCH at a time
+        conn = tune_conn(sqlite3.connect(self.config.scraper_db))
+        pending: List[tuple] = []
 
-            # Process results as they complete
-            for future in as_completed(future_to_doc):
-                processed += 1
+        # Workers only need the id and path, so don't pickle the whole row.
+        # Chunks shrink for small runs so every worker still gets a few.
+        jobs = [{'id': doc['id'], 'pdf_local_path': doc['pdf_local_path']} for doc in docs]
+        chunksize = max(1, min(EXTRACT_CHUNKSIZE, min(len(jobs), EXTRACT_COMMIT_BATCH) // (workers * 4)))
 
-                try:
-                    att_id, text, file_type, error = future.result()
-                    self.save_extracted_text(att_id, text, file_type, error)
-
-                    if text:
-                        extracted += 1
-                    else:
-                        failed += 1
-                except Exception as e:
-                    failed += 1
-                    logger.error(f"Error processing document: {e}")
-
-                # Log progress every 100 docs
-                if processed % 100 == 0:
-                    logger.info(f"Progress: {processed}/{len(docs)} ({extracted} extracted, {failed} failed)")
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_extract_worker,
+                initargs=(self.config,),
+            ) as executor:
+                # One commit batch at a time, so a crash leaves at most one
+                # batch marked in progress
+                for start in range(0, len(jobs), EXTRACT_COMMIT_BATCH):
+                    batch = jobs[start:start + EXTRACT_COMMIT_BATCH]
+                    batch_ids = [job['id'] for job in batch]
+                    self.mark_in_progress(conn, batch_ids)
+                    last_beat = time.monotonic()
+
+                    # chunksize amortizes pickling; results come back in submission order
+                    for done, result in enumerate(
+                        executor.map(_extract_one, batch, chunksize=chunksize), 1
+                    ):
+                        processed += 1
+                        if time.monotonic() - last_beat >= EXTRACT_HEARTBEAT_SECONDS:
+                            self.touch_in_progress(conn, batch_ids[done:])
+                            last_beat = time.monotonic()
+
+                        try:
+                            att_id, text, file_type, error = result
+                            pending.append((att_id, text, file_type, error))
+
+                            if text:
+                                extracted += 1
+                            else:
+                                failed += 1
+                        except Exception as e:
+                            failed += 1
+                            logger.error(f"Error processing document: {e}")
+
+                        # Log progress every 100 docs
+                        if processed % 100 == 0:
+                            logger.info(f"Progress: {processed}/{len(docs)} ({extracted} extracted, {failed} failed)")
+
+                    self.save_extracted_texts(conn, pending)
+        finally:
+            # Keep whatever finished before a worker crash
+            self.save_extracted_texts(conn, pending)
+        conn.close()
 
         logger.info(f"\nPhase 1 Complete: Extracted {extracted}, Failed {failed}")
         return
@@ -528,39 +881,116 @@ class TextExtractor:
         extracted = 0
         failed = 0
 
+        conn = tune_conn(sqlite3.connect(self.config.scraper_db))
+        pending: List[tuple] = []
+
         for i, doc in enumerate(docs, 1):
             file_path = Path(doc['pdf_local_path'])
             filename = doc['filename'] or doc['resource_id']
 
-            if not file_path.exists():
-                self.save_extracted_text(doc['id'], None, 'missing', 'File not found')
+            if len(pending) >= EXTRACT_COMMIT_BATCH:
+                self.save_extracted_texts(conn, pending)
+            if (i - 1) % EXTRACT_COMMIT_BATCH == 0:
+                batch_end = i - 1 + EXTRACT_COMMIT_BATCH
+                self.mark_in_progress(conn, [d['id'] for d in docs[i - 1:batch_end]])
+                last_beat = time.monotonic()
+            elif time.monotonic() - last_beat >= EXTRACT_HEARTBEAT_SECONDS:
+                self.touch_in_progress(conn, [d['id'] for d in docs[i - 1:batch_end]])
+                last_beat = time.monotonic()
+
+            try:
+                size = file_path.stat().st_size
+            except FileNotFoundError:
+                pending.append((doc['id'], None, 'missing', 'File not found'))
+                failed += 1
+                continue
+            if size < MIN_EXTRACT_BYTES:
+                pending.append((doc['id'], None, 'too_small', 'File too small'))
                 failed += 1
                 continue
 
             try:
                 file_type = detect_file_type(file_path)
-                text = self.extract_text(file_path)
+                text = self.extract_text(file_path, file_type)
 
                 if text and len(text) >= 50:
-                    self.save_extracted_text(doc['id'], text, file_type)
+                    pending.append((doc['id'], text, file_type, None))
                     extracted += 1
                     if i % 100 == 0:
                         logger.info(f"[{i}/{len(docs)}] Extracted: {extracted}, Failed: {failed}")
                 else:
-                    self.save_extracted_text(doc['id'], None, file_type, 'No extractable text')
+                    pending.append((doc['id'], None, file_type, 'No extractable text'))
                     failed += 1
 
+            except ScannedPDFError as e:
+                result = scanned_result(doc['id'], e)
+                pending.append(result)
+                if result[1]:
+                    extracted += 1
+                else:
+                    failed += 1
             except Exception as e:
-                self.save_extracted_text(doc['id'], None, 'error', str(e))
+                pending.append((doc['id'], None, 'error', str(e)))
                 failed += 1
 
+        self.save_extracted_texts(conn, pending)
+        conn.close()
+
         logger.info(f"\nPhase 1 Complete: Extracted {extracted}, Failed {failed}")
 
 
+# Per-process extractor for run_extraction's worker pool
+_worker_extractor: Optional[TextExtractor] = None
+
+
+def _init_extract_worker(config: AnalysisConfig):
+    """ProcessPoolExecutor initializer: build one TextExtractor per worker."""
+    global _worker_extractor
+    _worker_extractor = TextExtractor(config)
+
+
+def _extract_one(doc: Dict) -> tuple:
+    """Worker entry point (top-level so it pickles). Returns (att_id, text, file_type, error)."""
+    return _worker_extractor._process_single_doc(doc)
+
+
 # =============================================================================
 # Phase 2: Per-Opportunity AI Analysis
 # =============================================================================
 
+def _terms_re(*terms: str) -> re.Pattern:
+    """Compile literal terms into one case-insensitive alternation."""
+    return re.compile('|'.join(map(re.escape, terms)), re.IGNORECASE)
+
+
+# Framing around each document in the combined prompt text
+DOC_SEPARATOR = "\n" + "=" * 40 + "\n"
+
+
+def _head_of(pieces: List[str], n: int) -> str:
+    """First n characters of "".join(pieces), without joining everything."""
+    out = []
+    for piece in pieces:
+        if len(piece) >= n:
+            out.append(piece[:n])
+            break
+        out.append(piece)
+        n -= len(piece)
+    return "".join(out)
+
+
+def _tail_of(pieces: List[str], n: int) -> str:
+    """Last n characters of "".join(pieces), without joining everything."""
+    out = []
+    for piece in reversed(pieces):
+        if len(piece) >= n:
+            out.append(piece[len(piece) - n:])
+            break
+        out.append(piece)
+        n -= len(piece)
+    return "".join(reversed(out))
+
+
 class OpportunityAnalyzer:
     """Phase 2: Analyze opportunities using combined text from all documents."""
 
@@ -618,22 +1048,65 @@ Extract the following information and return ONLY a valid JSON object (no markdo
 
 Return ONLY the JSON object, no other text."""
 
+    # Template split around its one placeholder ({{ }} already unescaped),
+    # so building a prompt is a concatenation rather than a format() pass
+    _PROMPT_PREFIX, _PROMPT_SUFFIX = ANALYSIS_PROMPT.format(document_text='\0').split('\0')
+
     def __init__(self, config: AnalysisConfig):
         self.config = config
         self.model = config.model
+        self._conn: Optional[sqlite3.Connection] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._ollama_ok: Optional[bool] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared HTTP client, so Ollama requests reuse keep-alive connections."""
+        if self._client is None:
+            limits = httpx.Limits(
+                max_connections=self.config.analysis_concurrency,
+                max_keepalive_connections=self.config.analysis_concurrency,
+            )
+            self._client = httpx.AsyncClient(timeout=self.config.llm_timeout, limits=limits)
+        return self._client
+
+    def _result_conn(self) -> sqlite3.Connection:
+        """Connection reused for result writes across a run."""
+        if self._conn is None:
+            self._conn = tune_conn(sqlite3.connect(self.config.scraper_db))
+        return self._conn
+
+    def close(self):
+        """Close the result-writer connection, if open."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def aclose(self):
+        """Close the HTTP client and the result-writer connection."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self.close()
 
     async def check_ollama(self) -> bool:
-        """Check if Ollama is available."""
+        """Check if Ollama is available (checked once; the chosen model is kept)."""
+        if self._ollama_ok is None:
+            self._ollama_ok = await self._probe_ollama()
+        return self._ollama_ok
+
+    async def _probe_ollama(self) -> bool:
+        """Query /api/tags and pick the configured or fallback model."""
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                response = await client.get(f"{self.config.ollama_host}/api/tags")
-                if response.status_code == 200:
-                    models = [m['name'] for m in response.json().get('models', [])]
-                    if any(self.model in m for m in models):
-                        return True
-                    if any(self.config.fallback_model in m for m in models):
-                        self.model = self.config.fallback_model
-                        return True
+            response = await self._get_client().get(
+                f"{self.config.ollama_host}/api/tags", timeout=10
+            )
+            if response.status_code == 200:
+                models = [m['name'] for m in response.json().get('models', [])]
+                if any(self.model in m for m in models):
+                    return True
+                if any(self.config.fallback_model in m for m in models):
+                    self.model = self.config.fallback_model
+                    return True
             return False
         except:
             return False
@@ -641,7 +1114,7 @@ Return ONLY the JSON object, no other text."""
     def get_opportunities_for_analysis(self, limit: int = 1000) -> List[str]:
         """Get opportunity IDs that have extracted text but no analysis."""
 
-        conn = sqlite3.connect(self.config.scraper_db)
+        conn = tune_conn(sqlite3.connect(self.config.scraper_db))
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -659,62 +1132,73 @@ Return ONLY the JSON object, no other text."""
         conn.close()
         return results
 
-    def _score_document_importance(self, filename: str, text: str) -> int:
+    # Keyword groups for _score_document_importance, one case-insensitive
+    # alternation each so a filename/snippet is scanned once per group
+    _SOW_RE = _terms_re('statement of work', 'sow', 'pws', 'performance work statement',
+                        'scope of work', 'work statement')
+    _RFP_RE = _terms_re('rfp', 'rfq', 'rfi', 'request for proposal', 'request for quote',
+                        'solicitation', 'combined synopsis')
+    _PRICE_FN_RE = _terms_re('pricing', 'clin', 'cost', 'price schedule', 'b.', 'section b')
+    _PRICE_TX_RE = _terms_re('price schedule', 'clin', 'contract line item')
+    _TECH_FN_RE = _terms_re('technical', 'requirement', 'specification', 'section c', 'section l')
+    _TECH_TX_RE = _terms_re('technical requirements', 'minimum qualifications')
+    _EVAL_FN_RE = _terms_re('evaluation', 'criteria', 'section m', 'factor')
+    _EVAL_TX_RE = _terms_re('evaluation factor', 'evaluation criteria')
+    _LOW_RE = _terms_re('sf ', 'form ', 'clauses', 'far ', 'dfar', '52.2', 'attachment j')
+
+    def _score_document_importance(self, filename: str, text: str,
+                                   text_len: Optional[int] = None) -> int:
         """Score document importance for prioritization.
 
         Higher scores = more important documents.
         SOW/PWS > RFP/RFQ > Technical > Pricing > Other
+
+        Only the first 5K chars of text are inspected; pass text_len when
+        text is just that head of a longer document.
         """
+        if text_len is None:
+            text_len = len(text)
         score = 0
-        filename_lower = filename.lower()
-        text_lower = text[:5000].lower()  # Check first 5K chars
+        snippet = text[:5000]  # Check first 5K chars
 
         # Highest priority: Statement of Work / Performance Work Statement
-        sow_terms = ['statement of work', 'sow', 'pws', 'performance work statement',
-                     'scope of work', 'work statement']
-        if any(term in filename_lower for term in sow_terms):
+        if self._SOW_RE.search(filename):
             score += 100
-        if any(term in text_lower for term in sow_terms):
+        if self._SOW_RE.search(snippet):
             score += 50
 
         # High priority: RFP/RFQ documents
-        rfp_terms = ['rfp', 'rfq', 'rfi', 'request for proposal', 'request for quote',
-                     'solicitation', 'combined synopsis']
-        if any(term in filename_lower for term in rfp_terms):
+        if self._RFP_RE.search(filename):
             score += 80
-        if any(term in text_lower for term in rfp_terms):
+        if self._RFP_RE.search(snippet):
             score += 40
 
         # High priority: Pricing / CLIN documents
-        price_terms = ['pricing', 'clin', 'cost', 'price schedule', 'b.', 'section b']
-        if any(term in filename_lower for term in price_terms):
+        if self._PRICE_FN_RE.search(filename):
             score += 70
-        if any(term in text_lower for term in ['price schedule', 'clin', 'contract line item']):
+        if self._PRICE_TX_RE.search(snippet):
             score += 35
 
         # Medium priority: Technical requirements
-        tech_terms = ['technical', 'requirement', 'specification', 'section c', 'section l']
-        if any(term in filename_lower for term in tech_terms):
+        if self._TECH_FN_RE.search(filename):
             score += 60
-        if any(term in text_lower for term in ['technical requirements', 'minimum qualifications']):
+        if self._TECH_TX_RE.search(snippet):
             score += 30
 
         # Medium priority: Evaluation criteria
-        eval_terms = ['evaluation', 'criteria', 'section m', 'factor']
-        if any(term in filename_lower for term in eval_terms):
+        if self._EVAL_FN_RE.search(filename):
             score += 50
-        if any(term in text_lower for term in ['evaluation factor', 'evaluation criteria']):
+        if self._EVAL_TX_RE.search(snippet):
             score += 25
 
         # Lower priority: Attachments that are typically less useful
-        low_value_terms = ['sf ', 'form ', 'clauses', 'far ', 'dfar', '52.2', 'attachment j']
-        if any(term in filename_lower for term in low_value_terms):
+        if self._LOW_RE.search(filename):
             score -= 20
 
         # Bonus: Longer documents often have more substance
-        if len(text) > 10000:
+        if text_len > 10000:
             score += 15
-        elif len(text) > 5000:
+        elif text_len > 5000:
             score += 10
 
         return score
@@ -726,12 +1210,15 @@ Return ONLY the JSON object, no other text."""
         documents (SOW, RFP, Pricing, Technical) to fit within context limits.
         """
 
-        conn = sqlite3.connect(self.config.scraper_db)
+        conn = tune_conn(sqlite3.connect(self.config.scraper_db))
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
+        # Score from lengths and 5K heads only; full text is fetched (already
+        # truncated by SQLite) just for the documents that make the cut
         cursor.execute("""
-            SELECT filename, extracted_text, detected_type
+            SELECT id, filename, LENGTH(extracted_text) AS length,
+                   substr(extracted_text, 1, 5000) AS head
             FROM attachments
             WHERE opportunity_id = ?
             AND text_extracted = 1
@@ -741,9 +1228,9 @@ Return ONLY the JSON object, no other text."""
         """, (opp_id,))
 
         rows = cursor.fetchall()
-        conn.close()
 
         if not rows:
+            conn.close()
             return None, [], 0
 
         total_docs = len(rows)
@@ -752,13 +1239,13 @@ Return ONLY the JSON object, no other text."""
         scored_docs = []
         for row in rows:
             filename = row['filename'] or 'Unknown'
-            text = row['extracted_text']
-            score = self._score_document_importance(filename, text)
+            length = row['length']
+            score = self._score_document_importance(filename, row['head'], length)
             scored_docs.append({
+                'id': row['id'],
                 'filename': filename,
-                'text': text,
                 'score': score,
-                'length': len(text)
+                'length': length
             })
 
         # Sort by importance score (highest first)
@@ -769,45 +1256,80 @@ Return ONLY the JSON object, no other text."""
             top_5 = [f"{d['filename']} (score:{d['score']})" for d in scored_docs[:5]]
             logger.debug(f"Opportunity has {len(scored_docs)} docs, prioritizing: {top_5}")
 
-        combined_parts = []
-        filenames = []
+        max_doc = self.config.max_text_per_doc
+        truncated_marker = "\n[...truncated...]"
+
+        selected = []
+        remaining = 0
         total_len = 0
 
         for doc in scored_docs:
-            filename = doc['filename']
-            text = doc['text']
-
-            # Truncate individual docs if too long
-            if len(text) > self.config.max_text_per_doc:
-                text = text[:self.config.max_text_per_doc] + "\n[...truncated...]"
+            # Length after truncating individual docs that are too long
+            doc_len = doc['length']
+            if doc_len > max_doc:
+                doc_len = max_doc + len(truncated_marker)
 
             # Check if adding this doc would exceed our limit
-            new_len = total_len + len(text) + 100  # +100 for headers
+            new_len = total_len + doc_len + 100  # +100 for headers
 
-            if new_len > self.config.max_total_text and combined_parts:
+            if new_len > self.config.max_total_text and selected:
                 # We have enough content, stop adding
-                remaining = len(scored_docs) - len(filenames)
-                if remaining > 0:
-                    combined_parts.append(
-                        f"\n[...{remaining} additional lower-priority documents not included...]"
-                    )
+                remaining = len(scored_docs) - len(selected)
                 break
 
-            combined_parts.append(f"\n{'='*40}\nDOCUMENT: {filename}\n{'='*40}\n{text}")
+            selected.append(doc)
+            total_len += doc_len
+
+        ids = [doc['id'] for doc in selected]
+        placeholders = ','.join('?' * len(ids))
+        cursor.execute(f"""
+            SELECT id, substr(extracted_text, 1, ?) AS text
+            FROM attachments
+            WHERE id IN ({placeholders})
+        """, (max_doc, *ids))
+        texts = {row['id']: row['text'] for row in cursor.fetchall()}
+        conn.close()
+
+        # Flat list of pieces, joined once after the truncation decision
+        combined_parts = []
+        filenames = []
+
+        for doc in selected:
+            filename = doc['filename']
+            if combined_parts:
+                combined_parts.append("\n")
+            combined_parts.extend((DOC_SEPARATOR, "DOCUMENT: ", filename, DOC_SEPARATOR,
+                                   texts[doc['id']]))
+            if doc['length'] > max_doc:
+                combined_parts.append(truncated_marker)
             filenames.append(filename)
-            total_len += len(text)
 
-        combined_text = "\n".join(combined_parts)
+        if remaining > 0:
+            combined_parts.append(
+                f"\n\n[...{remaining} additional lower-priority documents not included...]"
+            )
 
         # Final safety truncation if still too long
-        if len(combined_text) > self.config.max_total_text:
-            half = self.config.max_total_text // 2
-            combined_text = combined_text[:half] + "\n\n[...content truncated...]\n\n" + combined_text[-half:]
+        max_total = self.config.max_total_text
+        if sum(map(len, combined_parts)) > max_total:
+            half = max_total // 2
+            combined_text = (_head_of(combined_parts, half)
+                             + "\n\n[...content truncated...]\n\n"
+                             + _tail_of(combined_parts, half))
+        else:
+            combined_text = "".join(combined_parts)
 
         return combined_text, filenames, total_docs
 
-    async def analyze_opportunity(self, opp_id: str) -> bool:
-        """Analyze a single opportunity using all its documents."""
+    async def analyze_opportunity(self, opp_id: str,
+                                  client: Optional[httpx.AsyncClient] = None) -> bool:
+        """Analyze a single opportunity using all its documents.
+
+        Uses the analyzer's shared client unless one is passed in.
+        """
+
+        if client is None:
+            client = self._get_client()
 
         combined_text, filenames, num_docs = self.get_combined_text_for_opportunity(opp_id)
 
@@ -817,46 +1339,45 @@ Return ONLY the JSON object, no other text."""
 
         logger.info(f"Analyzing {opp_id[:8]}... ({num_docs} docs, {len(combined_text):,} chars)")
 
-        prompt = self.ANALYSIS_PROMPT.format(document_text=combined_text)
+        prompt = "".join((self._PROMPT_PREFIX, combined_text, self._PROMPT_SUFFIX))
         start_time = datetime.now()
 
         try:
-            async with httpx.AsyncClient(timeout=self.config.llm_timeout) as client:
-                response = await client.post(
-                    f"{self.config.ollama_host}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.1,
-                            "num_predict": 4096,
-                            "top_p": 0.9,
-                        }
+            response = await client.post(
+                f"{self.config.ollama_host}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "options": {
+                        "temperature": 0.1,
+                        "num_predict": 4096,
+                        "top_p": 0.9,
                     }
-                )
+                }
+            )
 
-                if response.status_code != 200:
-                    duration = (datetime.now() - start_time).total_seconds()
-                    self._save_result(opp_id, 'failed', None, num_docs, filenames,
-                                     duration, f"Ollama error: {response.status_code}")
-                    return False
+            if response.status_code != 200:
+                duration = (datetime.now() - start_time).total_seconds()
+                self._save_result(opp_id, 'failed', None, num_docs, filenames,
+                                 duration, f"Ollama error: {response.status_code}")
+                return False
 
-                data = response.json()
-                response_text = data.get('response', '')
+            data = response.json()
+            response_text = data.get('response', '')
 
-                analysis = self._extract_json(response_text)
-                duration = (datetime.now() - start_time).total_seconds()
+            analysis = self._extract_json(response_text)
+            duration = (datetime.now() - start_time).total_seconds()
 
-                if analysis:
-                    self._save_result(opp_id, 'completed', analysis, num_docs,
-                                     filenames, duration)
-                    logger.info(f"✅ Completed {opp_id[:8]} in {duration:.1f}s")
-                    return True
-                else:
-                    self._save_result(opp_id, 'failed', None, num_docs, filenames,
-                                     duration, 'Could not parse JSON')
-                    return False
+            if analysis:
+                self._save_result(opp_id, 'completed', analysis, num_docs,
+                                 filenames, duration)
+                logger.info(f"✅ Completed {opp_id[:8]} in {duration:.1f}s")
+                return True
+            else:
+                self._save_result(opp_id, 'failed', None, num_docs, filenames,
+                                 duration, 'Could not parse JSON')
+                return False
 
         except asyncio.TimeoutError:
             duration = (datetime.now() - start_time).total_seconds()
@@ -869,6 +1390,8 @@ Return ONLY the JSON object, no other text."""
                              duration, str(e))
             return False
 
+    _JSON_FENCE_RE = re.compile(r'```(?:json)?\s*')
+
     def _extract_json(self, text: str) -> Optional[Dict]:
         """Extract JSON from LLM response."""
         try:
@@ -876,8 +1399,9 @@ Return ONLY the JSON object, no other text."""
         except:
             pass
 
-        text = re.sub(r'```json\s*', '', text)
-        text = re.sub(r'```\s*', '', text)
+        # Strip markdown code fences, if any
+        if '```' in text:
+            text = self._JSON_FENCE_RE.sub('', text)
 
         try:
             start = text.find('{')
@@ -894,7 +1418,9 @@ Return ONLY the JSON object, no other text."""
                     error: Optional[str] = None):
         """Save analysis result to database."""
 
-        conn = sqlite3.connect(self.config.scraper_db)
+        # Still one commit per result: each follows a multi-second LLM call,
+        # so a crash should lose at most the opportunity in flight
+        conn = self._result_conn()
         cursor = conn.cursor()
 
         cursor.execute("""
@@ -917,7 +1443,6 @@ Return ONLY the JSON object, no other text."""
         ))
 
         conn.commit()
-        conn.close()
 
     async def run_analysis(self, limit: int = 1000):
         """Run Phase 2: Analyze all pending opportunities."""
@@ -928,6 +1453,7 @@ Return ONLY the JSON object, no other text."""
 
         if not await self.check_ollama():
             logger.error("Ollama not available!")
+            await self.aclose()
             return
 
         logger.info(f"Using model: {self.model}")
@@ -937,25 +1463,39 @@ Return ONLY the JSON object, no other text."""
 
         if not opp_ids:
             logger.info("No pending opportunities")
+            await self.aclose()
             return
 
         completed = 0
         failed = 0
 
-        for i, opp_id in enumerate(opp_ids, 1):
-            logger.info(f"\n[{i}/{len(opp_ids)}]")
+        # Up to analysis_concurrency requests in flight, sharing one client
+        sem = asyncio.Semaphore(self.config.analysis_concurrency)
+        started = 0
 
-            try:
-                success = await self.analyze_opportunity(opp_id)
-                if success:
-                    completed += 1
-                else:
-                    failed += 1
-            except Exception as e:
-                logger.error(f"Error: {e}")
-                failed += 1
+        async def analyze_bounded(opp_id: str) -> bool:
+            nonlocal started
+            async with sem:
+                started += 1
+                logger.info(f"\n[{started}/{len(opp_ids)}]")
+                return await self.analyze_opportunity(opp_id)
 
-            await asyncio.sleep(1)  # Brief pause
+        try:
+            results = await asyncio.gather(
+                *[analyze_bounded(opp_id) for opp_id in opp_ids],
+                return_exceptions=True,
+            )
+        finally:
+            await self.aclose()
+
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error: {result}")
+                failed += 1
+            elif result:
+                completed += 1
+            else:
+                failed += 1
 
         logger.info(f"\nPhase 2 Complete: {completed} analyzed, {failed} failed")
 
@@ -967,43 +1507,50 @@ Return ONLY the JSON object, no other text."""
 def get_stats(db_path: str = "bidking_sam.db") -> Dict:
     """Get statistics for both phases."""
 
-    conn = sqlite3.connect(db_path)
+    conn = tune_conn(sqlite3.connect(db_path))
     cursor = conn.cursor()
 
-    stats = {}
-
-    # Phase 1 stats
-    cursor.execute("SELECT COUNT(*) FROM attachments WHERE pdf_downloaded = 1")
-    stats['downloaded'] = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM attachments WHERE text_extracted = 1 AND extracted_text IS NOT NULL")
-    stats['text_extracted'] = cursor.fetchone()[0]
-
+    # One pass over attachments for every per-attachment count
     cursor.execute("""
-        SELECT COUNT(*) FROM attachments
-        WHERE pdf_downloaded = 1
-        AND (text_extracted = 0 OR text_extracted IS NULL)
+        SELECT
+            COALESCE(SUM(pdf_downloaded = 1), 0),
+            COALESCE(SUM(text_extracted = 1 AND extracted_text IS NOT NULL), 0),
+            COALESCE(SUM(pdf_downloaded = 1
+                         AND (text_extracted = 0 OR text_extracted IS NULL)), 0),
+            COALESCE(SUM(text_extracted = -1), 0),
+            COUNT(DISTINCT CASE WHEN text_extracted = 1 THEN opportunity_id END),
+            COUNT(DISTINCT CASE
+                WHEN text_extracted = 1 AND extracted_text IS NOT NULL
+                     AND NOT EXISTS (
+                         SELECT 1 FROM opportunity_analysis oa
+                         WHERE oa.opportunity_id = a.opportunity_id
+                     )
+                THEN opportunity_id END)
+        FROM attachments a
     """)
-    stats['extraction_pending'] = cursor.fetchone()[0]
-
-    # Phase 2 stats
-    cursor.execute("SELECT COUNT(DISTINCT opportunity_id) FROM attachments WHERE text_extracted = 1")
-    stats['opportunities_with_text'] = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM opportunity_analysis WHERE status = 'completed'")
-    stats['analyzed'] = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM opportunity_analysis WHERE status = 'failed'")
-    stats['failed'] = cursor.fetchone()[0]
+    (downloaded, text_extracted, extraction_pending, extraction_in_progress,
+     opportunities_with_text, analysis_pending) = cursor.fetchone()
 
     cursor.execute("""
-        SELECT COUNT(DISTINCT a.opportunity_id)
-        FROM attachments a
-        LEFT JOIN opportunity_analysis oa ON a.opportunity_id = oa.opportunity_id
-        WHERE a.text_extracted = 1 AND a.extracted_text IS NOT NULL
-        AND oa.id IS NULL
+        SELECT
+            COALESCE(SUM(status = 'completed'), 0),
+            COALESCE(SUM(status = 'failed'), 0)
+        FROM opportunity_analysis
     """)
-    stats['analysis_pending'] = cursor.fetchone()[0]
+    analyzed, failed = cursor.fetchone()
+
+    stats = {
+        # Phase 1 stats
+        'downloaded': downloaded,
+        'text_extracted': text_extracted,
+        'extraction_pending': extraction_pending,
+        'extraction_in_progress': extraction_in_progress,
+        # Phase 2 stats
+        'opportunities_with_text': opportunities_with_text,
+        'analyzed': analyzed,
+        'failed': failed,
+        'analysis_pending': analysis_pending,
+    }
 
     conn.close()
     return stats
@@ -1021,6 +1568,7 @@ def print_stats(db_path: str = "bidking_sam.db"):
     print(f"  Downloaded documents:    {stats['downloaded']:,}")
     print(f"  Text extracted:          {stats['text_extracted']:,}")
     print(f"  Pending extraction:      {stats['extraction_pending']:,}")
+    print(f"  Extraction in progress:  {stats['extraction_in_progress']:,}")
     print("\nPHASE 2: AI Analysis (per opportunity)")
     print(f"  Opportunities with text: {stats['opportunities_with_text']:,}")
     print(f"  Analyzed:                {stats['analyzed']:,}")
@@ -1033,15 +1581,30 @@ def print_stats(db_path: str = "bidking_sam.db"):
 # Export for BidKing
 # =============================================================================
 
+EXPORT_FROM_CLAUSE = """
+    FROM opportunity_analysis oa
+    JOIN opportunities o ON oa.opportunity_id = o.opportunity_id
+    WHERE oa.status = 'completed' AND oa.ai_summary IS NOT NULL
+"""
+
+
 def export_for_bidking(db_path: str = "bidking_sam.db",
                        output_file: str = "bidking_ai_import.json") -> int:
-    """Export per-opportunity analysis results for BidKing."""
+    """Export per-opportunity analysis results for BidKing.
+
+    Records are streamed to the file one per line inside the
+    "opportunities" array, so memory stays flat however many rows there are.
+    """
 
-    conn = sqlite3.connect(db_path)
+    conn = tune_conn(sqlite3.connect(db_path))
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
-    cursor.execute("""
+    # Count and rows come from the same read snapshot
+    cursor.execute("BEGIN")
+    total = cursor.execute(f"SELECT COUNT(*) {EXPORT_FROM_CLAUSE}").fetchone()[0]
+
+    cursor.execute(f"""
         SELECT
             o.opportunity_id,
             o.solicitation_number,
@@ -1053,43 +1616,47 @@ def export_for_bidking(db_path: str = "bidking_sam.db",
             oa.source_documents,
             oa.model_used,
             oa.analyzed_at
-        FROM opportunity_analysis oa
-        JOIN opportunities o ON oa.opportunity_id = o.opportunity_id
-        WHERE oa.status = 'completed' AND oa.ai_summary IS NOT NULL
+        {EXPORT_FROM_CLAUSE}
     """)
 
-    export_data = []
-
-    for row in cursor:
-        ai_summary = json.loads(row['ai_summary']) if row['ai_summary'] else {}
-        source_docs = json.loads(row['source_documents']) if row['source_documents'] else []
-
-        export_data.append({
-            "opportunity_id": row['opportunity_id'],
-            "solicitation_number": row['solicitation_number'],
-            "title": row['title'],
-            "agency_name": row['agency_name'],
-            "response_deadline": row['response_deadline'],
-            "ai_summary": ai_summary,
-            "source_documents": source_docs,
-            "analysis_metadata": {
-                "model_used": row['model_used'],
-                "analyzed_at": row['analyzed_at'],
-                "num_documents_analyzed": row['num_documents']
-            }
-        })
+    if HAS_ORJSON:
+        loads, dumps = orjson.loads, orjson.dumps
+    else:
+        loads, dumps = json.loads, lambda obj: json.dumps(obj).encode('utf-8')
 
-    conn.close()
+    exported = 0
+    try:
+        with open(output_file, 'wb') as f:
+            f.write(b'{"exported_at":%s,"total_opportunities":%d,"opportunities":['
+                    % (dumps(datetime.now().isoformat()), total))
+
+            for row in cursor:
+                ai_summary = loads(row['ai_summary']) if row['ai_summary'] else {}
+                source_docs = loads(row['source_documents']) if row['source_documents'] else []
+
+                record = {
+                    "opportunity_id": row['opportunity_id'],
+                    "solicitation_number": row['solicitation_number'],
+                    "title": row['title'],
+                    "agency_name": row['agency_name'],
+                    "response_deadline": row['response_deadline'],
+                    "ai_summary": ai_summary,
+                    "source_documents": source_docs,
+                    "analysis_metadata": {
+                        "model_used": row['model_used'],
+                        "analyzed_at": row['analyzed_at'],
+                        "num_documents_analyzed": row['num_documents']
+                    }
+                }
+                f.write((b"\n" if exported == 0 else b",\n") + dumps(record))
+                exported += 1
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            "exported_at": datetime.now().isoformat(),
-            "total_opportunities": len(export_data),
-            "opportunities": export_data
-        }, f, indent=2)
+            f.write(b"\n]}\n")
+    finally:
+        conn.close()
 
-    logger.info(f"Exported {len(export_data)} opportunities to {output_file}")
-    return len(export_data)
+    logger.info(f"Exported {exported} opportunities to {output_file}")
+    return exported
 
 
 # =============================================================================
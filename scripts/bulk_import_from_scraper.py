@@ -13,18 +13,26 @@ Usage:
 """
 
 import argparse
+import itertools
 import json
 import sqlite3
 import sys
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+# Faster JSON parsing for the scraped JSON columns (optional)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from sqlalchemy import text
+from sqlalchemy import func, select, text
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
@@ -32,6 +40,27 @@ from app.database import SessionLocal, engine
 from app.models import Opportunity, PointOfContact, OpportunityAttachment
 from app.config import settings
 
+# Rows are bulk-inserted and committed this many opportunities at a time
+IMPORT_CHUNK_SIZE = 5000
+
+# Counters returned by write_opportunities and summed into the import stats
+WRITE_STAT_KEYS = ('opportunities_inserted', 'opportunities_updated', 'contacts_inserted',
+                   'attachments_inserted', 'ai_summaries_added')
+
+# Rows fetched from the source SQLite cursor per step
+SOURCE_FETCH_SIZE = 1000
+
+# Read-side PRAGMAs for the (possibly multi-GB) scraper database
+SOURCE_CACHE_KB = 524288          # 512 MB page cache
+SOURCE_MMAP_BYTES = 16 << 30      # map up to 16 GB; reads skip the pager copy
+
+
+def loads_json(data: str) -> Any:
+    """Parse a JSON column, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def parse_date(date_str: str) -> Optional[str]:
     """Parse various date formats to YYYY-MM-DD"""
@@ -77,6 +106,23 @@ def get_state_code(state: str) -> Optional[str]:
     return state_map.get(state.lower(), state[:2].upper() if state else None)
 
 
+# Likelihood-score keyword groups, built once instead of on every call
+SMALL_SET_ASIDE_TERMS = ('small', 'sba', '8(a)', 'hubzone', 'sdvosb', 'wosb')
+LIGHT_NOTICE_TYPE_TERMS = ('sources sought', 'special notice', 'rfi')
+SERVICE_TITLE_TERMS = ('support', 'maintenance', 'subscription', 'license')
+SMALL_TITLE_TERMS = ('micro', 'small')
+BROAD_TITLE_TERMS = ('enterprise', 'system-wide', 'global', 'agency-wide')
+LARGE_DESC_TERMS = ('million', '$1,000,000', 'multi-year')
+
+
+def has_any(text: str, terms: tuple) -> bool:
+    """True if any term is a substring of text."""
+    for term in terms:
+        if term in text:
+            return True
+    return False
+
+
 def calculate_likelihood_score(opp: dict) -> int:
     """Calculate likelihood score (0-100) that contract is under $100K"""
     score = 50  # Start neutral
@@ -86,120 +132,371 @@ def calculate_likelihood_score(opp: dict) -> int:
     set_aside = (opp.get('set_aside_type') or '').lower()
     opp_type = (opp.get('type') or '').lower()
 
+    if not (title or desc or set_aside or opp_type):
+        return score
+
     # Positive indicators (likely smaller)
-    if any(x in set_aside for x in ['small', 'sba', '8(a)', 'hubzone', 'sdvosb', 'wosb']):
+    if has_any(set_aside, SMALL_SET_ASIDE_TERMS):
         score += 15
-    if any(x in opp_type for x in ['sources sought', 'special notice', 'rfi']):
+    if has_any(opp_type, LIGHT_NOTICE_TYPE_TERMS):
         score += 10
-    if any(x in title for x in ['support', 'maintenance', 'subscription', 'license']):
+    if has_any(title, SERVICE_TITLE_TERMS):
         score += 10
-    if any(x in title for x in ['micro', 'small']):
+    if has_any(title, SMALL_TITLE_TERMS):
         score += 15
 
     # Negative indicators (likely larger)
-    if any(x in title for x in ['enterprise', 'system-wide', 'global', 'agency-wide']):
+    if has_any(title, BROAD_TITLE_TERMS):
         score -= 15
     if 'idiq' in opp_type or 'idiq' in title:
         score -= 10
-    if any(x in desc for x in ['million', '$1,000,000', 'multi-year']):
+    if desc and has_any(desc, LARGE_DESC_TERMS):
         score -= 15
 
     return max(0, min(100, score))
 
 
-def load_source_data(source_db: str) -> tuple[List[dict], List[dict], List[dict]]:
-    """Load opportunities, attachments, and AI analyses from source database."""
+def build_opportunity_row(opp: dict, ai_list: List[dict]) -> dict:
+    """Map a scraper opportunity row to an Opportunity mapping."""
+    # Determine status
+    if opp.get('is_canceled'):
+        status = 'canceled'
+    elif not opp.get('is_active'):
+        status = 'archived'
+    else:
+        status = 'active'
+
+    opp_data = {
+        'id': uuid.uuid4(),
+        'notice_id': opp['opportunity_id'],
+        'solicitation_number': opp.get('solicitation_number'),
+        'title': opp.get('title', 'Untitled'),
+        'description': opp.get('description'),
+        'notice_type': opp.get('type'),
+        'posted_date': parse_date(opp.get('posted_date')),
+        'response_deadline': parse_datetime(opp.get('response_deadline')),
+        'department_name': opp.get('agency_name'),
+        'sub_tier': opp.get('sub_agency_name'),
+        'agency_name': opp.get('agency_name'),
+        'office_name': opp.get('office_name'),
+        'naics_code': opp.get('naics_code'),
+        'psc_code': opp.get('psc_code'),
+        'set_aside_type': opp.get('set_aside_type'),
+        'set_aside_description': opp.get('set_aside_description'),
+        'pop_city': opp.get('place_city'),
+        'pop_state': get_state_code(opp.get('place_state_code') or opp.get('place_state')),
+        'pop_country': opp.get('place_country') or 'USA',
+        'award_amount': opp.get('award_amount'),
+        'awardee_name': opp.get('award_awardee'),
+        'awardee_uei': opp.get('award_awardee_uei'),
+        'ui_link': opp.get('sam_gov_link'),
+        'status': status,
+        'likelihood_score': calculate_likelihood_score(opp),
+        'fetched_at': parse_datetime(opp.get('scraped_at')) or datetime.utcnow(),
+        # Always present so every row in an upsert batch has the same keys
+        'ai_estimated_value_low': None,
+        'ai_estimated_value_high': None,
+        'ai_estimated_value_basis': None,
+    }
+
+    # Get AI analysis for this opportunity (use first one's estimated value)
+    if ai_list:
+        ai_summary = ai_list[0]['ai_summary_parsed']
+        if ai_summary:
+            est_value = ai_summary.get('estimated_value', {})
+            if est_value:
+                opp_data['ai_estimated_value_low'] = est_value.get('low')
+                opp_data['ai_estimated_value_high'] = est_value.get('high')
+                opp_data['ai_estimated_value_basis'] = est_value.get('basis')
+
+    return opp_data
+
+
+def upsert_opportunities(db, rows: List[dict]) -> Dict[str, Any]:
+    """
+    Insert or update a chunk of opportunity mappings with one
+    INSERT ... ON CONFLICT (notice_id) DO UPDATE, returning notice_id -> id.
+
+    As with the old per-row update, only non-NULL incoming values overwrite
+    existing columns. A returned id equal to the row's generated id means
+    the row was inserted.
+    """
+    table = Opportunity.__table__
+    insert = pg_insert if db.get_bind().dialect.name == 'postgresql' else sqlite_insert
+    stmt = insert(table)
+
+    update_cols = {
+        name: func.coalesce(stmt.excluded[name], table.c[name])
+        for name in rows[0] if name not in ('id', 'notice_id')
+    }
+    update_cols['updated_at'] = datetime.utcnow()
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['notice_id'], set_=update_cols
+    ).returning(table.c.notice_id, table.c.id)
+
+    return dict(db.execute(stmt, rows).all())
+
+
+def build_child_rows(opp: dict, ai_list: List[dict], opp_attachments: List[dict]) -> Tuple[List[dict], List[dict], int]:
+    """
+    Map an opportunity's contacts and attachments to PointOfContact and
+    OpportunityAttachment mappings, without opportunity_id (filled in once
+    the opportunity is upserted). Also returns the number of AI summaries
+    attached.
+    """
+    new_pocs = []
+    new_atts = []
+    ai_summaries_added = 0
+
+    # Import contacts
+    contacts = loads_json(opp.get('contacts_json') or '[]')
+    for contact in contacts:
+        if contact.get('name') or contact.get('email'):
+            new_pocs.append({
+                'contact_type': contact.get('type', 'primary'),
+                'name': contact.get('name'),
+                'title': contact.get('title'),
+                'email': contact.get('email'),
+                'phone': contact.get('phone'),
+            })
+
+    # Import attachments with AI summaries. Every attachment
+    # gets the first non-empty summary for the opportunity.
+    first_ai = next((ai for ai in ai_list if ai['ai_summary_parsed']), None)
+    raw_attachments = loads_json(opp.get('attachments_json') or '[]')
+
+    # Combine scraped attachment info with downloaded content
+    for raw_att in raw_attachments:
+        resource_id = raw_att.get('resourceId')
+
+        # Find matching downloaded attachment
+        downloaded = next(
+            (a for a in opp_attachments if a['resource_id'] == resource_id),
+            None
+        )
+
+        att_record = {
+            'name': raw_att.get('filename'),
+            'url': raw_att.get('downloadUrl'),
+            'resource_type': 'file',
+            'file_type': raw_att.get('type', '').split('/')[-1] if raw_att.get('type') else None,
+            'file_size': raw_att.get('size'),
+            'posted_date': parse_datetime(raw_att.get('postedDate')),
+            'extraction_status': 'pending',
+        }
+
+        # Add extracted text if available
+        if downloaded and downloaded['extracted_text']:
+            att_record['text_content'] = downloaded['extracted_text']
+            att_record['extraction_status'] = 'extracted'
+            att_record['extracted_at'] = datetime.utcnow()
+
+        if first_ai:
+            att_record['ai_summary'] = first_ai['ai_summary_parsed']
+            att_record['ai_summary_status'] = 'summarized'
+            att_record['ai_summarized_at'] = parse_datetime(first_ai.get('analyzed_at'))
+            ai_summaries_added += 1
+
+        new_atts.append(att_record)
+
+    return new_pocs, new_atts, ai_summaries_added
+
+
+def write_opportunities(db, prepared: List[tuple]) -> Dict[str, int]:
+    """
+    Upsert prepared (opportunity mapping, contacts, attachments, AI summary
+    count) tuples and insert their child rows. Does not commit; returns the
+    counts to add to the import stats.
+    """
+    counts = dict.fromkeys(WRITE_STAT_KEYS, 0)
+    opp_ids = upsert_opportunities(db, [opp_data for opp_data, _, _, _ in prepared])
+
+    poc_rows = []
+    att_rows = []
+    for opp_data, new_pocs, new_atts, ai_summaries_added in prepared:
+        opp_id = opp_ids[opp_data['notice_id']]
+        if opp_id == opp_data['id']:
+            counts['opportunities_inserted'] += 1
+        else:
+            counts['opportunities_updated'] += 1
+        poc_rows.extend({**row, 'opportunity_id': opp_id} for row in new_pocs)
+        att_rows.extend({**row, 'opportunity_id': opp_id} for row in new_atts)
+        counts['contacts_inserted'] += len(new_pocs)
+        counts['attachments_inserted'] += len(new_atts)
+        counts['ai_summaries_added'] += ai_summaries_added
+
+    db.bulk_insert_mappings(PointOfContact, poc_rows)
+    db.bulk_insert_mappings(OpportunityAttachment, att_rows)
+    return counts
+
+
+OPPORTUNITIES_QUERY = """
+    SELECT
+        opportunity_id,
+        solicitation_number,
+        title,
+        description,
+        type,
+        type_code,
+        posted_date,
+        modified_date,
+        response_deadline,
+        is_active,
+        is_canceled,
+        agency_name,
+        sub_agency_name,
+        office_name,
+        naics_code,
+        psc_code,
+        set_aside_type,
+        set_aside_description,
+        place_city,
+        place_state,
+        place_state_code,
+        place_country,
+        sam_gov_link,
+        award_amount,
+        award_awardee,
+        award_awardee_uei,
+        contacts_json,
+        attachments_json,
+        scraped_at
+    FROM opportunities
+    ORDER BY opportunity_id
+"""
+
+# Attachments with text content
+ATTACHMENTS_QUERY = """
+    SELECT
+        opportunity_id,
+        resource_id,
+        filename,
+        mime_type,
+        file_size,
+        access_level,
+        posted_date,
+        download_url,
+        text_extracted,
+        extracted_text
+    FROM attachments
+    WHERE downloaded = 1 OR text_extracted = 1
+    ORDER BY opportunity_id
+"""
 
-    conn = sqlite3.connect(source_db)
+AI_ANALYSES_QUERY = """
+    SELECT
+        opportunity_id,
+        attachment_id,
+        status,
+        text_content,
+        ai_summary,
+        model_used,
+        analyzed_at
+    FROM ai_analysis
+    WHERE status = 'completed' AND ai_summary IS NOT NULL
+    ORDER BY opportunity_id
+"""
+
+
+def open_source_db(source_db: str) -> sqlite3.Connection:
+    """Open the scraper database read-only with a large cache and mmap."""
+    conn = sqlite3.connect(f"{Path(source_db).resolve().as_uri()}?mode=ro", uri=True)
     conn.row_factory = sqlite3.Row
+    conn.executescript(f"""
+        PRAGMA cache_size=-{SOURCE_CACHE_KB};
+        PRAGMA mmap_size={SOURCE_MMAP_BYTES};
+        PRAGMA temp_store=MEMORY;
+    """)
+    return conn
+
+
+def iter_rows(conn: sqlite3.Connection, query: str, as_dict: bool = True) -> Iterator:
+    """Stream query results, SOURCE_FETCH_SIZE rows per fetch.
+
+    Rows are converted to dicts unless as_dict is False, in which case the
+    sqlite3.Row objects are yielded as-is (index access only, no .get()).
+    """
     cursor = conn.cursor()
+    cursor.arraysize = SOURCE_FETCH_SIZE
+    cursor.execute(query)
+    while rows := cursor.fetchmany():
+        if as_dict:
+            yield from map(dict, rows)
+        else:
+            yield from rows
+
+
+def iter_opportunities(conn: sqlite3.Connection) -> Iterator[dict]:
+    """Stream scraped opportunities."""
+    return iter_rows(conn, OPPORTUNITIES_QUERY)
+
+
+def iter_attachments(conn: sqlite3.Connection) -> Iterator[sqlite3.Row]:
+    """Stream downloaded/extracted attachments as raw sqlite3.Row objects."""
+    return iter_rows(conn, ATTACHMENTS_QUERY, as_dict=False)
+
+
+def iter_ai_analyses(conn: sqlite3.Connection) -> Iterator[dict]:
+    """Stream completed AI analyses."""
+    return iter_rows(conn, AI_ANALYSES_QUERY)
 
-    # Load opportunities
-    cursor.execute("""
-        SELECT
-            opportunity_id,
-            solicitation_number,
-            title,
-            description,
-            type,
-            type_code,
-            posted_date,
-            modified_date,
-            response_deadline,
-            is_active,
-            is_canceled,
-            agency_name,
-            sub_agency_name,
-            office_name,
-            naics_code,
-            psc_code,
-            set_aside_type,
-            set_aside_description,
-            place_city,
-            place_state,
-            place_state_code,
-            place_country,
-            sam_gov_link,
-            award_amount,
-            award_awardee,
-            award_awardee_uei,
-            contacts_json,
-            attachments_json,
-            scraped_at
-        FROM opportunities
-    """)
-    opportunities = [dict(row) for row in cursor.fetchall()]
-
-    # Load attachments with text content
-    cursor.execute("""
-        SELECT
-            opportunity_id,
-            resource_id,
-            filename,
-            mime_type,
-            file_size,
-            access_level,
-            posted_date,
-            download_url,
-            text_extracted,
-            extracted_text
-        FROM attachments
-        WHERE downloaded = 1 OR text_extracted = 1
-    """)
-    attachments = [dict(row) for row in cursor.fetchall()]
-
-    # Load AI analyses
-    cursor.execute("""
-        SELECT
-            opportunity_id,
-            attachment_id,
-            status,
-            text_content,
-            ai_summary,
-            model_used,
-            analyzed_at
-        FROM ai_analysis
-        WHERE status = 'completed' AND ai_summary IS NOT NULL
-    """)
-    ai_analyses = [dict(row) for row in cursor.fetchall()]
 
-    conn.close()
+class SortedRows:
+    """Walks a stream sorted by opportunity_id in step with the opportunities.
 
-    print(f"Loaded from {source_db}:")
-    print(f"  - {len(opportunities):,} opportunities")
-    print(f"  - {len(attachments):,} attachments with content")
-    print(f"  - {len(ai_analyses):,} AI analyses")
+    All three source queries are ORDER BY opportunity_id, so each
+    opportunity's attachments and analyses can be pulled off the front of
+    their streams (a merge join) instead of grouping them into dicts first.
+    """
 
-    return opportunities, attachments, ai_analyses
+    def __init__(self, rows: Iterable):
+        self._rows = iter(rows)
+        self._head = next(self._rows, None)
+
+    def advance_while(self, key: Optional[str]) -> list:
+        """Return the rows for key, skipping orphans that sort before it."""
+        if key is None:
+            return []
+        head = self._head
+        while head is not None and (head['opportunity_id'] is None or head['opportunity_id'] < key):
+            head = next(self._rows, None)
+        group = []
+        while head is not None and head['opportunity_id'] == key:
+            group.append(head)
+            head = next(self._rows, None)
+        self._head = head
+        return group
+
+
+def count_source_data(conn: sqlite3.Connection, source_db: str) -> int:
+    """Print source row counts; returns the number of opportunities."""
+    counts = [
+        conn.execute(f"SELECT COUNT(*) FROM ({query})").fetchone()[0]
+        for query in (OPPORTUNITIES_QUERY, ATTACHMENTS_QUERY, AI_ANALYSES_QUERY)
+    ]
+
+    print(f"Found in {source_db}:")
+    print(f"  - {counts[0]:,} opportunities")
+    print(f"  - {counts[1]:,} attachments with content")
+    print(f"  - {counts[2]:,} AI analyses")
+
+    return counts[0]
 
 
 def import_to_bidking(
-    opportunities: List[dict],
-    attachments: List[dict],
-    ai_analyses: List[dict],
+    opportunities: Iterable[dict],
+    attachments: Iterable[sqlite3.Row],
+    ai_analyses: Iterable[dict],
+    total: int,
     dry_run: bool = False
 ) -> dict:
-    """Import data into BidKing database."""
+    """Import data into BidKing database.
+
+    opportunities is consumed IMPORT_CHUNK_SIZE rows at a time, so it can be
+    a streaming cursor; total is only used for progress output. All three
+    streams must be sorted by opportunity_id.
+    """
 
     stats = {
         'opportunities_inserted': 0,
@@ -210,183 +507,87 @@ def import_to_bidking(
         'errors': []
     }
 
-    # Build lookup for AI analyses by opportunity_id
-    ai_by_opp = {}
-    for ai in ai_analyses:
-        opp_id = ai['opportunity_id']
-        if opp_id not in ai_by_opp:
-            ai_by_opp[opp_id] = []
-        ai_by_opp[opp_id].append(ai)
-
-    # Build lookup for attachments by opportunity_id
-    att_by_opp = {}
-    for att in attachments:
-        opp_id = att['opportunity_id']
-        if opp_id not in att_by_opp:
-            att_by_opp[opp_id] = []
-        att_by_opp[opp_id].append(att)
+    # Attachments and analyses are merge-joined against the opportunity stream
+    ai_stream = SortedRows(ai_analyses)
+    att_stream = SortedRows(attachments)
 
     if dry_run:
         print("\n=== DRY RUN - No changes will be made ===\n")
 
+    opportunities = iter(opportunities)
+    chunk_end = 0
+
     with SessionLocal() as db:
-        for i, opp in enumerate(opportunities):
+        while chunk := list(itertools.islice(opportunities, IMPORT_CHUNK_SIZE)):
+            chunk_start = chunk_end
+            chunk_end = chunk_start + len(chunk)
+
+            # (opportunity mapping, contacts, attachments, AI summary count)
+            # for rows whose opportunity and child rows all mapped cleanly
+            prepared = []
+            for opp in chunk:
+                ai_list = ai_stream.advance_while(opp['opportunity_id'])
+                opp_attachments = att_stream.advance_while(opp['opportunity_id'])
+
+                # Parse each AI summary once
+                for ai in ai_list:
+                    try:
+                        ai['ai_summary_parsed'] = loads_json(ai['ai_summary']) if isinstance(ai['ai_summary'], str) else ai['ai_summary']
+                    except ValueError as e:
+                        ai['ai_summary_parsed'] = None
+                        stats['errors'].append(f"{ai['opportunity_id']}: unreadable AI summary: {str(e)}")
+
+                try:
+                    prepared.append((
+                        build_opportunity_row(opp, ai_list),
+                        *build_child_rows(opp, ai_list, opp_attachments),
+                    ))
+                except Exception as e:
+                    stats['errors'].append(f"{opp.get('opportunity_id')}: {str(e)}")
+                    if len(stats['errors']) <= 5:
+                        print(f"  Error: {opp.get('opportunity_id')}: {e}")
+
+            if not prepared:
+                continue
+
+            if dry_run:
+                # Dry run - just count
+                notice_ids = [opp_data['notice_id'] for opp_data, _, _, _ in prepared]
+                existing = set(db.scalars(
+                    select(Opportunity.notice_id).where(Opportunity.notice_id.in_(notice_ids))
+                ))
+                stats['opportunities_updated'] += len(existing)
+                stats['opportunities_inserted'] += len(prepared) - len(existing)
+                print(f"  Processed {chunk_end:,} / {total:,} opportunities...")
+                continue
+
+            # Opportunities, contacts and attachments for the chunk commit together
             try:
-                notice_id = opp['opportunity_id']
-
-                # Check if opportunity exists
-                existing = db.query(Opportunity).filter(
-                    Opportunity.notice_id == notice_id
-                ).first()
-
-                # Determine status
-                if opp.get('is_canceled'):
-                    status = 'canceled'
-                elif not opp.get('is_active'):
-                    status = 'archived'
-                else:
-                    status = 'active'
-
-                # Calculate likelihood score
-                score = calculate_likelihood_score(opp)
-
-                # Build opportunity record
-                opp_data = {
-                    'notice_id': notice_id,
-                    'solicitation_number': opp.get('solicitation_number'),
-                    'title': opp.get('title', 'Untitled'),
-                    'description': opp.get('description'),
-                    'notice_type': opp.get('type'),
-                    'posted_date': parse_date(opp.get('posted_date')),
-                    'response_deadline': parse_datetime(opp.get('response_deadline')),
-                    'department_name': opp.get('agency_name'),
-                    'sub_tier': opp.get('sub_agency_name'),
-                    'agency_name': opp.get('agency_name'),
-                    'office_name': opp.get('office_name'),
-                    'naics_code': opp.get('naics_code'),
-                    'psc_code': opp.get('psc_code'),
-                    'set_aside_type': opp.get('set_aside_type'),
-                    'set_aside_description': opp.get('set_aside_description'),
-                    'pop_city': opp.get('place_city'),
-                    'pop_state': get_state_code(opp.get('place_state_code') or opp.get('place_state')),
-                    'pop_country': opp.get('place_country') or 'USA',
-                    'award_amount': opp.get('award_amount'),
-                    'awardee_name': opp.get('award_awardee'),
-                    'awardee_uei': opp.get('award_awardee_uei'),
-                    'ui_link': opp.get('sam_gov_link'),
-                    'status': status,
-                    'likelihood_score': score,
-                    'fetched_at': parse_datetime(opp.get('scraped_at')) or datetime.utcnow(),
-                }
-
-                # Get AI analysis for this opportunity (use first one's estimated value)
-                ai_list = ai_by_opp.get(notice_id, [])
-                if ai_list:
-                    ai_data = ai_list[0]
-                    ai_summary = json.loads(ai_data['ai_summary']) if isinstance(ai_data['ai_summary'], str) else ai_data['ai_summary']
-                    if ai_summary:
-                        est_value = ai_summary.get('estimated_value', {})
-                        if est_value:
-                            opp_data['ai_estimated_value_low'] = est_value.get('low')
-                            opp_data['ai_estimated_value_high'] = est_value.get('high')
-                            opp_data['ai_estimated_value_basis'] = est_value.get('basis')
-
-                if not dry_run:
-                    if existing:
-                        # Update existing
-                        for key, value in opp_data.items():
-                            if value is not None:
-                                setattr(existing, key, value)
-                        existing.updated_at = datetime.utcnow()
-                        opp_id = existing.id
-                        stats['opportunities_updated'] += 1
-                    else:
-                        # Insert new
-                        new_opp = Opportunity(**opp_data)
-                        db.add(new_opp)
-                        db.flush()  # Get the ID
-                        opp_id = new_opp.id
-                        stats['opportunities_inserted'] += 1
-
-                    # Import contacts
-                    contacts = json.loads(opp.get('contacts_json') or '[]')
-                    for contact in contacts:
-                        if contact.get('name') or contact.get('email'):
-                            poc = PointOfContact(
-                                opportunity_id=opp_id,
-                                contact_type=contact.get('type', 'primary'),
-                                name=contact.get('name'),
-                                title=contact.get('title'),
-                                email=contact.get('email'),
-                                phone=contact.get('phone'),
-                            )
-                            db.add(poc)
-                            stats['contacts_inserted'] += 1
-
-                    # Import attachments with AI summaries
-                    opp_attachments = att_by_opp.get(notice_id, [])
-                    raw_attachments = json.loads(opp.get('attachments_json') or '[]')
-
-                    # Combine scraped attachment info with downloaded content
-                    for raw_att in raw_attachments:
-                        resource_id = raw_att.get('resourceId')
-
-                        # Find matching downloaded attachment
-                        downloaded = next(
-                            (a for a in opp_attachments if a.get('resource_id') == resource_id),
-                            None
-                        )
-
-                        att_record = OpportunityAttachment(
-                            opportunity_id=opp_id,
-                            name=raw_att.get('filename'),
-                            url=raw_att.get('downloadUrl'),
-                            resource_type='file',
-                            file_type=raw_att.get('type', '').split('/')[-1] if raw_att.get('type') else None,
-                            file_size=raw_att.get('size'),
-                            posted_date=parse_datetime(raw_att.get('postedDate')),
-                            extraction_status='pending',
-                        )
-
-                        # Add extracted text if available
-                        if downloaded and downloaded.get('extracted_text'):
-                            att_record.text_content = downloaded['extracted_text']
-                            att_record.extraction_status = 'extracted'
-                            att_record.extracted_at = datetime.utcnow()
-
-                        # Find AI summary for this attachment
-                        for ai in ai_list:
-                            ai_summary_data = json.loads(ai['ai_summary']) if isinstance(ai['ai_summary'], str) else ai['ai_summary']
-                            if ai_summary_data:
-                                att_record.ai_summary = ai_summary_data
-                                att_record.ai_summary_status = 'summarized'
-                                att_record.ai_summarized_at = parse_datetime(ai.get('analyzed_at'))
-                                stats['ai_summaries_added'] += 1
-                                break  # Use first AI summary found
-
-                        db.add(att_record)
-                        stats['attachments_inserted'] += 1
-
-                else:
-                    # Dry run - just count
-                    if existing:
-                        stats['opportunities_updated'] += 1
-                    else:
-                        stats['opportunities_inserted'] += 1
-
-                # Progress update every 100
-                if (i + 1) % 100 == 0:
-                    print(f"  Processed {i + 1:,} / {len(opportunities):,} opportunities...")
-                    if not dry_run:
-                        db.commit()
-
+                chunk_stats = write_opportunities(db, prepared)
+                db.commit()
             except Exception as e:
-                stats['errors'].append(f"{opp.get('opportunity_id')}: {str(e)}")
-                if len(stats['errors']) <= 5:
-                    print(f"  Error: {opp.get('opportunity_id')}: {e}")
+                db.rollback()
+                print(f"  Error: chunk {chunk_start + 1}-{chunk_end} rolled back, retrying per opportunity: {e}")
+                chunk_stats = dict.fromkeys(WRITE_STAT_KEYS, 0)
+                # One transaction per opportunity, so a bad row loses only its own opportunity
+                for item in prepared:
+                    try:
+                        item_stats = write_opportunities(db, [item])
+                        db.commit()
+                    except Exception as e:
+                        db.rollback()
+                        stats['errors'].append(f"{item[0]['notice_id']}: {str(e)}")
+                        if len(stats['errors']) <= 5:
+                            print(f"  Error: {item[0]['notice_id']}: {e}")
+                        continue
+                    for key, count in item_stats.items():
+                        chunk_stats[key] += count
+
+            for key, count in chunk_stats.items():
+                stats[key] += count
+            print(f"  Processed {chunk_end:,} / {total:,} opportunities...")
 
         if not dry_run:
-            db.commit()
             print(f"\n  Committed all changes to database")
 
     return stats
@@ -418,16 +619,23 @@ def main():
     print(f"Target: BidKing database ({settings.database_url[:50]}...)")
     print()
 
-    # Load source data
-    opportunities, attachments, ai_analyses = load_source_data(str(source_path))
+    # Source rows are streamed during the import, not loaded up front
+    conn = open_source_db(str(source_path))
+    total = count_source_data(conn, str(source_path))
 
-    if not opportunities:
+    if not total:
         print("No opportunities found in source database")
         sys.exit(1)
 
     # Perform import
     print("\nStarting import...")
-    stats = import_to_bidking(opportunities, attachments, ai_analyses, dry_run=args.dry_run)
+    try:
+        stats = import_to_bidking(
+            iter_opportunities(conn), iter_attachments(conn), iter_ai_analyses(conn),
+            total, dry_run=args.dry_run
+        )
+    finally:
+        conn.close()
 
     # Print results
     print("\n" + "=" * 60)